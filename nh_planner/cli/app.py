@@ -1,5 +1,7 @@
 import click
 
+from nh_planner.cli.commands.bench import bench
+from nh_planner.cli.commands.cache import cache
 from nh_planner.cli.commands.filter import filter
 from nh_planner.cli.commands.info import info
 from nh_planner.cli.commands.list_screenings import list_screenings
@@ -20,3 +22,5 @@ cli.add_command(filter)
 cli.add_command(models)
 cli.add_command(recommend)
 cli.add_command(list_screenings)
+cli.add_command(bench)
+cli.add_command(cache)
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import click
+import numpy as np
+import sqlite_vec
+
+from nh_planner.core.models import Movie, ProgrammeEntry
+from nh_planner.services.database import Database
+from nh_planner.services.filters import MovieFilter
+from nh_planner.services.parsers import available_parsers, get_parser
+from nh_planner.services.replay import (
+    ReplayRoute,
+    synthetic_detail_html,
+    synthetic_programme_html,
+    write_synthetic_fixtures,
+)
+from nh_planner.services.scraper import PlaywrightFetcher, Scraper
+from nh_planner.services.vectors import as_matrix, normalize, to_blob
+
+QUANTIZATIONS = ("int8", "binary")
+
+
+def populate_synthetic(db: Database, movies: int, days: int) -> None:
+    """Fill db with `movies` films, each screened once a day for `days` days"""
+    start = datetime.now() + timedelta(days=1)
+    for day in range(days):
+        date = (start + timedelta(days=day)).strftime("%Y-%m-%d")
+        entries = [
+            ProgrammeEntry(
+                movie=Movie(
+                    title=f"Film {i}",
+                    duration=80 + i % 90,
+                    director=f"Reżyser {i % 500}",
+                    genre="dramat",
+                    production="Polska 2024",
+                    description=f"Opis filmu {i}. " * 20,
+                    href=f"film/{i}",
+                ),
+                screenings=[f"{date} {10 + i % 12}:00"],
+            )
+            for i in range(movies)
+        ]
+        db.ingest_day(date, entries)
+
+
+def report(label: str, count: int, seconds: float, unit: str) -> None:
+    click.echo(
+        f"{label:<24} {count:>8} {unit} in {seconds:8.3f}s "
+        f"({count / seconds:,.0f} {unit}/s)"
+    )
+
+
+@click.group()
+def bench():
+    """Offline micro-benchmarks on synthetic data"""
+    pass
+
+
+@bench.command()
+@click.option("--movies", default=2_000, help="Number of synthetic movies")
+@click.option("--days", default=5, help="Screening days per movie")
+@click.option("--repeat", default=5, help="Query repetitions per path")
+def rows(movies: int, days: int, repeat: int):
+    """Compare validated and raw row materialization in filter_movies"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # Without the result cache every repetition runs the query.
+        db = Database(Path(tmp) / "bench.db", query_cache_size=0)
+        populate_synthetic(db, movies, days)
+        movie_filter = MovieFilter()
+
+        for label, validate in (("pydantic models", True), ("MovieRow records", False)):
+            count = 0
+            start = time.perf_counter()
+            for _ in range(repeat):
+                count += len(db.filter_movies(movie_filter, validate=validate))
+            report(label, count, time.perf_counter() - start, "rows")
+        db.close()
+
+
+@bench.command()
+@click.option(
+    "--fixtures",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=None,
+    help="Directory of recorded programme-*.html and details-*.html pages",
+)
+@click.option("--repeat", default=20, help="Passes over the page set")
+@click.option(
+    "--min-pages-per-sec",
+    type=float,
+    default=None,
+    help="Exit with status 1 if the default parser is slower than this",
+)
+def parse(fixtures: Path, repeat: int, min_pages_per_sec: float):
+    """Measure HTML extraction throughput of every available parser"""
+    if fixtures:
+        programmes = [p.read_text() for p in sorted(fixtures.glob("programme-*.html"))]
+        details = [p.read_text() for p in sorted(fixtures.glob("details-*.html"))]
+    else:
+        programmes = [synthetic_programme_html(40) for _ in range(7)]
+        details = [synthetic_detail_html(i) for i in range(40)]
+
+    throughput = {}
+    for name in available_parsers():
+        parser = get_parser(name)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for html in programmes:
+                parser.programme(html)
+            for html in details:
+                parser.details(html)
+        pages = repeat * (len(programmes) + len(details))
+        seconds = time.perf_counter() - start
+        throughput[name] = pages / seconds
+        report(name, pages, seconds, "pages")
+
+    default = get_parser().name
+    if min_pages_per_sec and throughput[default] < min_pages_per_sec:
+        click.echo(
+            f"{default} parsed {throughput[default]:,.0f} pages/s, "
+            f"below the {min_pages_per_sec:,.0f} pages/s floor"
+        )
+        sys.exit(1)
+
+
+@bench.command()
+@click.option("--days", default=7, help="Programme days to scrape")
+@click.option("--films", default=40, help="Films per synthetic programme day")
+@click.option(
+    "--fixtures",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=None,
+    help="Directory recorded with `nh refresh --record` instead of synthetic pages",
+)
+@click.option("--jobs", "-j", default=4, help="Concurrent fetches")
+def scrape(days: int, films: int, fixtures: Path, jobs: int):
+    """Run scrape_movies through headless Chromium against a replay of the site"""
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        if fixtures is None:
+            fixtures = Path(tmp) / "fixtures"
+            fixtures.mkdir()
+            start = datetime.now() + timedelta(days=1)
+            dates = [
+                (start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)
+            ]
+            write_synthetic_fixtures(fixtures, dates, films)
+
+        db = Database(Path(tmp) / "bench.db")
+        replay = ReplayRoute(fixtures)
+        scraper = Scraper(db, PlaywrightFetcher(replay=replay))
+        start = time.perf_counter()
+        changes = asyncio.run(scraper.scrape_movies(days, jobs=jobs))
+        seconds = time.perf_counter() - start
+
+        writes = db.get_detailed_stats()["total_movies"] + sum(
+            day.added for day in changes
+        )
+        db.close()
+    logging.disable(logging.NOTSET)
+
+    report("pages", replay.pages, seconds, "pages")
+    report("db writes", writes, seconds, "rows")
+    click.echo(f"{'wall time':<24} {seconds:8.3f}s")
+
+
+@bench.command()
+@click.option("--count", default=512, help="Vectors per batch")
+@click.option("--dim", default=1024, help="Vector dimension")
+@click.option("--repeat", default=5, help="Batches per path")
+def vectors(count: int, dim: int, repeat: int):
+    """Compare list-based and float32 matrix normalization and serialization"""
+    # Embed responses arrive as lists of Python floats.
+    batch = np.random.default_rng(0).standard_normal((count, dim)).tolist()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for embedding in batch:
+            norm = sum([x**2 for x in embedding]) ** 0.5
+            sqlite_vec.serialize_float32([x / norm for x in embedding])
+    report("python lists", count * repeat, time.perf_counter() - start, "vectors")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for embedding in normalize(as_matrix(batch)):
+            to_blob(embedding)
+    report("float32 matrix", count * repeat, time.perf_counter() - start, "vectors")
+
+
+def vector_table_bytes(db: Database, table: str) -> int:
+    """Bytes of vector data in a vec0 table's chunk shadow tables"""
+    with db.connect() as conn:
+        chunks = conn.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE ? || '_vector_chunks%'",
+            (table,),
+        ).fetchall()
+        return sum(
+            conn.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vectors)), 0) FROM {name}"
+            ).fetchone()[0]
+            for (name,) in chunks
+        )
+
+
+@bench.command()
+@click.option("--movies", default=5_000, help="Number of synthetic movies")
+@click.option("--dim", default=1024, help="Vector dimension")
+@click.option("--queries", default=50, help="Queries per mode")
+@click.option("-k", "--limit", default=10, help="Results per query")
+def knn(movies: int, dim: int, queries: int, limit: int):
+    """Compare exact and quantized-with-rerank similarity search"""
+    rng = np.random.default_rng(0)
+    # Clustered vectors, so neighbourhoods are meaningful as with real films.
+    centers = rng.standard_normal((max(1, movies // 25), dim))
+    vectors = centers[rng.integers(0, len(centers), movies)]
+    vectors = normalize(as_matrix(vectors + 0.8 * rng.standard_normal(vectors.shape)))
+    probes = vectors[rng.integers(0, movies, queries)]
+    probes = normalize(as_matrix(probes + 0.3 * rng.standard_normal(probes.shape)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db", query_cache_size=0)
+        populate_synthetic(db, movies, 1)
+        ids = db.get_movie_ids_by_href()
+        index = db.create_vector_index("bench", dim)
+        db.store_embedding_results(
+            index, [(ids[f"film/{i}"], vectors[i]) for i in range(movies)], []
+        )
+        db.activate_vector_index(index.name)
+        full_bytes = vector_table_bytes(db, index.name)
+
+        exact = []
+        start = time.perf_counter()
+        for probe in probes:
+            exact.append(
+                {m.href for m in db.get_similar_movies(index, probe, limit, False)}
+            )
+        seconds = time.perf_counter() - start
+        click.echo(
+            f"{'float32 exact':<16} {full_bytes / 1024 / 1024:8.1f} MiB "
+            f"{seconds / queries * 1000:8.2f} ms/query  recall@{limit} 1.000"
+        )
+
+        for quantization in QUANTIZATIONS:
+            db.quantize_vector_index(index, quantization)
+            index = index._replace(quantization=quantization)
+            coarse_bytes = vector_table_bytes(db, index.coarse_table)
+            hits = 0
+            start = time.perf_counter()
+            for probe, expected in zip(probes, exact, strict=True):
+                found = db.get_similar_movies(index, probe, limit, False)
+                hits += len(expected & {m.href for m in found})
+            seconds = time.perf_counter() - start
+            click.echo(
+                f"{quantization + ' + rerank':<16} {coarse_bytes / 1024 / 1024:8.1f} MiB "
+                f"{seconds / queries * 1000:8.2f} ms/query  "
+                f"recall@{limit} {hits / (queries * limit):.3f}"
+            )
+        db.close()
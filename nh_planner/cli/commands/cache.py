@@ -0,0 +1,44 @@
+import click
+
+from nh_planner.core.config import QUERY_EMBEDDING_CACHE_SIZE
+from nh_planner.services.database import Database
+from nh_planner.services.page_cache import PageCache
+
+
+@click.group()
+def cache():
+    """Manage the on-disk caches of scraped pages, query embeddings and results"""
+    pass
+
+
+@cache.command()
+def stats():
+    """Show cache usage"""
+    page_cache = PageCache()
+    stats = page_cache.stats()
+    click.echo(f"Pages: {stats['pages']} ({stats['fresh_pages']} fresh)")
+    click.echo(
+        f"Size: {stats['bytes'] / 1024 / 1024:.1f} MiB "
+        f"of {stats['max_bytes'] / 1024 / 1024:.0f} MiB"
+    )
+    click.echo(f"TTL: {stats['ttl'] / 3600:g} h")
+    db = Database()
+    click.echo(
+        f"Query embeddings: {db.count_query_embeddings()} "
+        f"of {QUERY_EMBEDDING_CACHE_SIZE}"
+    )
+    results = db.query_cache_stats()
+    click.echo(
+        f"Query results: {results['size']} of {results['maxsize']} "
+        f"({results['hits']} hits, {results['misses']} misses)"
+    )
+
+
+@cache.command()
+def clear():
+    """Remove every cached page, query embedding and query result"""
+    PageCache().clear()
+    db = Database()
+    db.clear_query_embeddings()
+    db.clear_query_results()
+    click.echo("Caches cleared")
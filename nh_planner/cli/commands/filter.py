@@ -1,16 +1,28 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import click
 
 from nh_planner.cli.commands.utils import display_table
 from nh_planner.services.database import Database
 from nh_planner.services.filters import MovieFilter
-from nh_planner.services.get_next_day_date import get_next_day_date
+from nh_planner.services.get_next_day_date import get_next_day_window
 
 
 @click.command()
-@click.option("--title", "-t", type=str, default=None, help="Filter by movie title")
-@click.option("--director", "-d", type=str, default=None, help="Filter by director")
+@click.option(
+    "--title",
+    "-t",
+    type=str,
+    default=None,
+    help="Filter by movie title; each word matches the start of a title word",
+)
+@click.option(
+    "--director",
+    "-d",
+    type=str,
+    default=None,
+    help="Filter by director; each word matches the start of a name",
+)
 @click.option(
     "--min-duration", type=int, default=None, help="Minimum duration in minutes"
 )
@@ -26,23 +38,36 @@ from nh_planner.services.get_next_day_date import get_next_day_date
 )
 @click.option("--end_date", "-e", type=str, default=None, help="End date")
 @click.option("--use-fuzzy", is_flag=True, help="Use fuzzy search")
+@click.option(
+    "--search",
+    "-q",
+    type=str,
+    default=None,
+    help="Full-text search in titles, directors, genres and descriptions",
+)
 @click.option(
     "--day", type=str, default=None, help="Filter by day of week (e.g., Monday, Tue)"
 )
 def filter(
-    title, director, min_duration, max_duration, start_date, end_date, use_fuzzy, day
+    title,
+    director,
+    min_duration,
+    max_duration,
+    start_date,
+    end_date,
+    use_fuzzy,
+    search,
+    day,
 ):
     """Filter movies by various criteria"""
     db = Database()
 
     if day:
-        start_date = get_next_day_date(day)
-        if not start_date:
+        window = get_next_day_window(day)
+        if not window:
             click.echo(f"Invalid day: {day}")
             return
-        end_date = (
-            datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=1)
-        ).strftime("%Y-%m-%d")
+        start_date, end_date = window
 
     filter_params = MovieFilter(
         title=title,
@@ -52,10 +77,11 @@ def filter(
         start_date=start_date,
         end_date=end_date,
         use_fuzzy=use_fuzzy,
+        search=search,
     )
 
     try:
-        movies = db.filter_movies(*filter_params.to_sql())
+        movies = db.filter_movies(filter_params)
         display_table(movies)
     except Exception as e:
         click.echo(f"Error: {e}")
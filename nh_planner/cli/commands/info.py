@@ -28,12 +28,17 @@ ASCII_OPTIONS = {
 
 
 @click.command()
-def info():
+@click.option(
+    "--reconcile", is_flag=True, help="Rebuild the statistics from scratch first"
+)
+def info(reconcile: bool):
     """Display detailed statistics about movies and screenings"""
     db = Database()
     console = Console()
 
     try:
+        if reconcile:
+            db.rebuild_stats()
         stats = db.get_detailed_stats()
 
         ascii_image = Panel(
@@ -1,16 +1,33 @@
+import re
+from typing import Optional
+
 import click
 
 from nh_planner.cli.commands.utils import display_movie
 from nh_planner.services.database import Database
 
 
+def parse_count_range(ctx, param, value: str) -> tuple[int, Optional[int]]:
+    """Parse `k`, `>=k`, `<=k` or `k..m` into inclusive (min, max) bounds"""
+    value = value.strip()
+    if match := re.fullmatch(r"(\d+)", value):
+        return int(match[1]), int(match[1])
+    if match := re.fullmatch(r">=\s*(\d+)", value):
+        return int(match[1]), None
+    if match := re.fullmatch(r"<=\s*(\d+)", value):
+        return 1, int(match[1])
+    if match := re.fullmatch(r"(\d+)\s*\.\.\s*(\d+)", value):
+        return int(match[1]), int(match[2])
+    raise click.BadParameter("expected k, >=k, <=k or k..m")
+
+
 @click.command()
-@click.argument("k", type=int)
-def list_screenings(k: int):
-    """Show movies with k screenings"""
+@click.argument("k", callback=parse_count_range)
+def list_screenings(k: tuple[int, Optional[int]]):
+    """Show movies with k future screenings (k, >=k, <=k or k..m)"""
     db = Database()
     try:
-        movies = db.get_movies_with_k_screenings(k)
+        movies = db.get_movies_with_k_screenings(*k)
         for movie in movies:
             display_movie(movie)
     except Exception as e:
@@ -1,8 +1,11 @@
 import asyncio
+import subprocess
+import sys
 
 import click
 from ollama import Client
 
+from nh_planner.core.config import DB_PATH
 from nh_planner.services.database import Database
 from nh_planner.services.embeddings import (
     EmbeddingService,
@@ -10,6 +13,8 @@ from nh_planner.services.embeddings import (
     save_models_config,
 )
 
+REBUILD_LOG = DB_PATH.parent / "rebuild.log"
+
 
 async def ensure_model(model: str) -> bool:
     client = Client()
@@ -34,17 +39,33 @@ def models():
 
 @models.command()
 def show():
-    """Show current models configuration"""
+    """Show current models configuration and embedding indexes"""
     config = load_models_config()
     click.echo(f"Chat model: {config['chat_model']}")
     click.echo(f"Embedding model: {config['embed_model']}")
 
+    db = Database()
+    for index in db.get_vector_indexes():
+        status = (
+            "active" if index.active else "complete" if index.complete else "building"
+        )
+        mode = f", {index.quantization} coarse search" if index.quantization else ""
+        click.echo(
+            f"  {index.name}: {index.embed_model or 'unknown model'}, "
+            f"{index.dim} dims{mode}, {db.count_index_entries(index)} movies "
+            f"({status})"
+        )
+        failures = db.count_embedding_failures(index)
+        if failures:
+            click.echo(f"    {failures} movies failed and will be retried")
+
 
 @models.command()
 @click.option("--chat", help="Set chat model")
 @click.option("--embed", help="Set embedding model")
 @click.option("--force-recalc", is_flag=True, help="Force recalculation of embeddings")
-def set(chat: str, embed: str, force_recalc: bool):
+@click.option("--foreground", is_flag=True, help="Rebuild embeddings before returning")
+def set(chat: str, embed: str, force_recalc: bool, foreground: bool):
     """Set models and optionally recalculate embeddings"""
     config = load_models_config()
     changed = False
@@ -62,20 +83,65 @@ def set(chat: str, embed: str, force_recalc: bool):
             click.echo("Aborting due to embedding model installation failure")
             return
         old_embed = config["embed_model"]
+        # Attribute a pre-existing untracked index to the model that built it
+        # before the configuration moves on.
+        EmbeddingService(Database()).active_index()
         config["embed_model"] = embed
         changed = True
         click.echo(f"Embedding model set to {embed}")
 
-        if old_embed != embed or force_recalc:
-            click.echo("Recalculating embeddings...")
+    if changed:
+        save_models_config(config)
 
-            db = Database()
-            with db.connect() as conn:
-                conn.execute("DELETE FROM embeddings")
+    if embed and (old_embed != embed or force_recalc):
+        if foreground:
+            run_rebuild(force_recalc)
+        else:
+            start_background_rebuild(force_recalc)
+
+
+def run_rebuild(fresh: bool) -> None:
+    click.echo("Rebuilding embeddings...")
+    index = asyncio.run(EmbeddingService(Database()).rebuild_index(fresh))
+    if index:
+        click.echo(f"Recommendations now use {index.name}")
+    else:
+        click.echo(
+            "Some movies could not be embedded; run `nh models rebuild` to resume"
+        )
+
+
+def start_background_rebuild(fresh: bool) -> None:
+    command = [sys.executable, "-m", "nh_planner.main", "models", "rebuild"]
+    with open(REBUILD_LOG, "a") as log:
+        subprocess.Popen(
+            command + (["--fresh"] if fresh else []),
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    click.echo(
+        "Rebuilding embeddings in the background; recommendations keep using "
+        f"the current index until it completes (log: {REBUILD_LOG})"
+    )
 
-            embedding_service = EmbeddingService(db)
-            asyncio.run(embedding_service.process_pending_embeddings())
-            click.echo("Embeddings recalculated successfully")
 
-    if changed:
-        save_models_config(config)
+@models.command()
+@click.argument("mode", type=click.Choice(["int8", "binary", "none"]))
+def quantize(mode: str):
+    """Search the active index through a quantized copy and rerank (none: exact)"""
+    service = EmbeddingService(Database())
+    index = service.active_index()
+    if index is None:
+        click.echo("No embedding index yet; run `nh refresh` first")
+        return
+    service.db.quantize_vector_index(index, None if mode == "none" else mode)
+    click.echo(f"{index.name} now searched in {mode} mode")
+
+
+@models.command()
+@click.option("--fresh", is_flag=True, help="Start a new index instead of resuming")
+def rebuild(fresh: bool):
+    """Build the embedding index for the configured model, then switch to it"""
+    run_rebuild(fresh)
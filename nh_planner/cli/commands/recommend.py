@@ -1,21 +1,76 @@
+from datetime import datetime
+
 import click
 
 from nh_planner.cli.commands.utils import display_movie
 from nh_planner.services.database import Database
 from nh_planner.services.embeddings import EmbeddingService
+from nh_planner.services.filters import MovieFilter
+from nh_planner.services.get_next_day_date import get_next_day_window
 
 
 @click.command()
 @click.argument("description")
 @click.option("-k", "--limit", default=5, help="Number of recommendations")
-def recommend(description: str, limit: int):
-    """Recommend movies based on description"""
+@click.option(
+    "--director",
+    "-d",
+    type=str,
+    default=None,
+    help="Filter by director; each word matches the start of a name",
+)
+@click.option(
+    "--min-duration", type=int, default=None, help="Minimum duration in minutes"
+)
+@click.option(
+    "--max-duration", type=int, default=None, help="Maximum duration in minutes"
+)
+@click.option(
+    "--start_date",
+    "-s",
+    type=str,
+    default=datetime.now().strftime("%Y-%m-%d %H:%M"),
+    help="Start date",
+)
+@click.option("--end_date", "-e", type=str, default=None, help="End date")
+@click.option("--use-fuzzy", is_flag=True, help="Use fuzzy director matching")
+@click.option(
+    "--day", type=str, default=None, help="Filter by day of week (e.g., Monday, Tue)"
+)
+def recommend(
+    description: str,
+    limit: int,
+    director,
+    min_duration,
+    max_duration,
+    start_date,
+    end_date,
+    use_fuzzy,
+    day,
+):
+    """Recommend movies screening in a date window based on description"""
     db = Database()
     embedding_service = EmbeddingService(db)
 
+    if day:
+        window = get_next_day_window(day)
+        if not window:
+            click.echo(f"Invalid day: {day}")
+            return
+        start_date, end_date = window
+
+    movie_filter = MovieFilter(
+        director=director,
+        min_duration=min_duration,
+        max_duration=max_duration,
+        start_date=start_date,
+        end_date=end_date,
+        use_fuzzy=use_fuzzy,
+    )
+
     try:
         click.echo(f"\nFinding {limit} movies matching: {description}")
-        movies = embedding_service.find_similar_movies(description, limit)
+        movies = embedding_service.find_similar_movies(description, limit, movie_filter)
 
         if not movies:
             click.echo("No matching movies found.")
@@ -1,27 +1,84 @@
 import asyncio
+from pathlib import Path
+from typing import Optional
 
 import click
 
+from nh_planner.core.config import BLOCKED_RESOURCE_TYPES, PAGE_WAIT_UNTIL
 from nh_planner.services.database import Database
 from nh_planner.services.embeddings import EmbeddingService
-from nh_planner.services.scraper import Scraper
+from nh_planner.services.page_cache import PageCache
+from nh_planner.services.replay import RecordingFetcher
+from nh_planner.services.scraper import PlaywrightFetcher, Scraper
 
 
 @click.command()
 @click.argument("days", type=int, default=0)
 @click.option("--force", "-f", is_flag=True, help="Force refresh even if data exists")
-def refresh(days: int, force: bool):
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Days scraped in parallel",
+)
+@click.option(
+    "--block",
+    default=",".join(BLOCKED_RESOURCE_TYPES),
+    show_default=True,
+    help="Comma-separated resource types Playwright skips; empty to load all",
+)
+@click.option(
+    "--wait-until",
+    type=click.Choice(["commit", "domcontentloaded", "load", "networkidle"]),
+    default=PAGE_WAIT_UNTIL,
+    show_default=True,
+    help="Navigation event Playwright waits for",
+)
+@click.option("--no-page-cache", is_flag=True, help="Bypass the on-disk page cache")
+@click.option(
+    "--record",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Save every fetched page to this directory as a replay fixture",
+)
+def refresh(
+    days: int,
+    force: bool,
+    jobs: int,
+    block: str,
+    wait_until: str,
+    no_page_cache: bool,
+    record: Optional[Path],
+):
     """Refresh movie data for the next N days"""
     db = Database()
-    scraper = Scraper(db)
+    page_fetcher = PlaywrightFetcher(
+        blocked_types=[t.strip() for t in block.split(",") if t.strip()],
+        wait_until=wait_until,
+    )
+    if record:
+        page_fetcher = RecordingFetcher(page_fetcher, record)
+    # Recording needs every page to come from the site.
+    page_cache = None if no_page_cache or record else PageCache()
+    scraper = Scraper(db, page_fetcher, page_cache=page_cache)
     embedding_service = EmbeddingService(db)
     try:
-        asyncio.run(scraper.scrape_movies(days, force))
+        changes = asyncio.run(scraper.scrape_movies(days, force, jobs))
         click.echo(f"Successfully refreshed data for next {days} days")
+        for day in changes:
+            if day.added or day.removed:
+                click.echo(f"  {day.date}: +{day.added} / -{day.removed} screenings")
     except Exception as e:
         click.echo(f"Error during refresh: {e}")
     try:
         asyncio.run(embedding_service.process_pending_embeddings())
         click.echo("Successfully updated embeddings")
+        active = embedding_service.active_index()
+        if active and active.embed_model != embedding_service.embed_model:
+            click.echo(
+                f"Index for {embedding_service.embed_model} is not complete yet; "
+                "run `nh models rebuild` to resume it"
+            )
     except Exception as e:
         click.echo(f"Error during embeddings update: {e}")
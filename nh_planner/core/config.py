@@ -3,5 +3,36 @@ from pathlib import Path
 
 BASE_URL = "https://www.kinonh.pl/"
 PROGRAMME_URL = f"{BASE_URL}#repertuar@"
+# Resource types a Playwright page never needs to expose the programme; scripts
+# stay allowed because the programme view is rendered client-side.
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font", "stylesheet")
+BLOCKED_URL_PATTERNS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "facebook.net",
+    "doubleclick.net",
+)
+PAGE_WAIT_UNTIL = "domcontentloaded"
 DB_PATH = Path(os.path.expanduser("~/.config/kinonh/kinonh.db"))
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+PAGE_CACHE_PATH = DB_PATH.parent / "pages.db"
+PAGE_CACHE_TTL = 12 * 60 * 60
+PAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DB_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "cache_size": -16_000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5_000,
+}
+# Filter and recommendation results kept in the database between commands.
+QUERY_CACHE_SIZE = 128
+# Recommendation prompts whose embeddings are kept, least recently used dropped first.
+QUERY_EMBEDDING_CACHE_SIZE = 1_000
+# Translated texts sent to Ollama's embed endpoint per request.
+EMBED_BATCH_SIZE = 32
+# Pending movies read per query and embeddings written per transaction.
+EMBED_CHUNK_SIZE = 256
+EMBED_FLUSH_SIZE = 64
+# Candidates per requested result fetched from a quantized index for reranking.
+RERANK_OVERSAMPLE = 8
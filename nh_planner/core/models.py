@@ -1,6 +1,16 @@
-from typing import Optional
+from datetime import datetime
+from typing import NamedTuple, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+SCREENING_DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def normalize_screening_date(value: str) -> str:
+    """Zero-pad to SCREENING_DATE_FORMAT so text order matches time order"""
+    return datetime.strptime(value.strip(), SCREENING_DATE_FORMAT).strftime(
+        SCREENING_DATE_FORMAT
+    )
 
 
 class Movie(BaseModel):
@@ -13,10 +23,59 @@ class Movie(BaseModel):
     href: str = Field(..., min_length=1)
 
 
-class Screening(BaseModel):
-    movie_id: int = Field(...)
-    date: str = Field(...)
-
-
 class MovieWithScreenings(Movie):
     screenings: str = Field(...)
+
+
+class MovieRow(NamedTuple):
+    """Unvalidated query row with the fields of MovieWithScreenings"""
+
+    title: str
+    duration: int
+    director: Optional[str]
+    genre: Optional[str]
+    production: Optional[str]
+    description: Optional[str]
+    href: str
+    screenings: Optional[str]
+
+    def to_model(self) -> MovieWithScreenings:
+        return MovieWithScreenings.model_validate(self._asdict())
+
+
+class VectorIndex(NamedTuple):
+    """A vec0 table of movie embeddings from one model; embed_model is None for
+    the index predating per-model tables until its model is claimed"""
+
+    name: str
+    embed_model: Optional[str]
+    dim: int
+    complete: bool
+    active: bool
+    quantization: Optional[str] = None
+
+    @property
+    def coarse_table(self) -> Optional[str]:
+        """Quantized copy searched before reranking, if the index has one"""
+        return f"{self.name}_{self.quantization}" if self.quantization else None
+
+
+class DayChanges(NamedTuple):
+    """Screenings inserted into and deleted from one day by an ingest"""
+
+    date: str
+    added: int = 0
+    removed: int = 0
+
+
+class ProgrammeEntry(BaseModel):
+    """A film on one scraped programme day; movie is None when already stored"""
+
+    movie_id: Optional[int] = None
+    movie: Optional[Movie] = None
+    screenings: list[str] = Field(default_factory=list)
+
+    @field_validator("screenings")
+    @classmethod
+    def normalize_screenings(cls, value: list[str]) -> list[str]:
+        return [normalize_screening_date(s) for s in value]
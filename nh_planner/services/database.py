@@ -1,42 +1,105 @@
+import hashlib
+import json
 import logging
+import re
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Generator, Optional
+from typing import Callable, Generator, Optional, Union
 
+import numpy as np
 import sqlite_vec
 
-from nh_planner.core.config import DB_PATH
-from nh_planner.core.models import Movie, MovieWithScreenings, Screening
+from nh_planner.core.config import (
+    DB_PATH,
+    DB_PRAGMAS,
+    QUERY_CACHE_SIZE,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    RERANK_OVERSAMPLE,
+)
+from nh_planner.core.models import (
+    DayChanges,
+    Movie,
+    MovieRow,
+    MovieWithScreenings,
+    ProgrammeEntry,
+    VectorIndex,
+    normalize_screening_date,
+)
+from nh_planner.services.filters import MovieFilter
+from nh_planner.services.fuzzy import (
+    FUZZY_FIELDS,
+    FUZZY_MAX_DISTANCE,
+    bounded_levenshtein,
+    min_shared_trigrams,
+    normalize_text,
+    trigrams,
+)
+from nh_planner.services.vectors import from_blob, to_blob
 
 logger = logging.getLogger(__name__)
 
+# PRAGMA user_version from which screening dates are stored zero-padded.
+PADDED_DATES_VERSION = 1
+# bm25 weights for the title, director, genre and description columns.
+FTS_RANK = "bm25(10.0, 5.0, 2.0, 1.0)"
+# vec0 column type and SQL quantizer of each compact index mode; int8 assumes
+# unit-length vectors.
+QUANTIZERS = {
+    "int8": ("int8", "vec_quantize_int8({}, 'unit')"),
+    "binary": ("bit", "vec_quantize_binary({})"),
+}
 
-def create_levenshtein_function(conn: sqlite3.Connection) -> None:
-    def levenshtein(s1: str, s2: str) -> int:
-        s1 = s1.lower()
-        s2 = s2.lower()
-        len_s1 = len(s1)
-        len_s2 = len(s2)
 
-        if len_s1 == 0:
-            return len_s2
-        if len_s2 == 0:
-            return len_s1
+def day_range(date: str) -> tuple[str, str]:
+    """Half-open [start, end) screening_date bounds covering one calendar day"""
+    day = datetime.strptime(date[:10], "%Y-%m-%d")
+    return day.strftime("%Y-%m-%d"), (day + timedelta(days=1)).strftime("%Y-%m-%d")
 
-        previous_row = range(len_s2 + 1)
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
 
-        return previous_row[-1]
+def movie_row_factory(cursor: sqlite3.Cursor, row: tuple) -> MovieRow:
+    return MovieRow._make(row)
 
-    conn.create_function("LEVENSHTEIN", 2, levenshtein)
+
+def screenings_since(rows: list[MovieRow], start: str) -> list[MovieRow]:
+    """Rows without their screenings before start; films left with none are dropped"""
+    kept = []
+    for row in rows:
+        screenings = [s for s in (row.screenings or "").split("\n") if s >= start]
+        if screenings:
+            kept.append(row._replace(screenings="\n".join(screenings)))
+    return kept
+
+
+def today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+UPSERT_MOVIE = """
+    INSERT INTO movies (title, duration, director, genre, production, description, href)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(title, director) DO UPDATE SET
+        duration=excluded.duration,
+        genre=excluded.genre,
+        production=excluded.production,
+        description=excluded.description,
+        href=excluded.href
+    """
+
+
+def movie_params(movie: Movie) -> tuple:
+    return (
+        movie.title,
+        movie.duration,
+        movie.director,
+        movie.genre,
+        movie.production,
+        movie.description,
+        movie.href,
+    )
 
 
 INIT_SCHEMA = """
@@ -60,105 +123,511 @@ INIT_SCHEMA = """
         UNIQUE(movie_id, screening_date)
     );
 
+    -- (movie_id, screening_date) is served by the UNIQUE constraint's index.
+    CREATE INDEX IF NOT EXISTS idx_screenings_date_movie
+        ON screenings(screening_date, movie_id);
+
     CREATE TABLE IF NOT EXISTS scraped_dates (
         id INTEGER PRIMARY KEY,
         date TEXT UNIQUE
     );
 
-    CREATE VIRTUAL TABLE IF NOT EXISTS embeddings using vec0(
-        movie_id integer primary key,
-        embedding float[1024]
+    CREATE TABLE IF NOT EXISTS stats (
+        name TEXT PRIMARY KEY,
+        value
     );
+
+    CREATE TABLE IF NOT EXISTS daily_screenings (
+        day TEXT,
+        movie_id INTEGER,
+        screenings INTEGER,
+        PRIMARY KEY(day, movie_id)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS stats_movies_insert AFTER INSERT ON movies BEGIN
+        UPDATE stats SET value = value + 1 WHERE name = 'total_movies';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_movies_delete AFTER DELETE ON movies BEGIN
+        UPDATE stats SET value = value - 1 WHERE name = 'total_movies';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_scraped_insert AFTER INSERT ON scraped_dates BEGIN
+        UPDATE stats SET value = (SELECT MAX(date) FROM scraped_dates)
+        WHERE name = 'last_scraped';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_scraped_delete AFTER DELETE ON scraped_dates BEGIN
+        UPDATE stats SET value = (SELECT MAX(date) FROM scraped_dates)
+        WHERE name = 'last_scraped';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_screenings_insert AFTER INSERT ON screenings BEGIN
+        INSERT INTO daily_screenings (day, movie_id, screenings)
+        VALUES (SUBSTR(new.screening_date, 1, 10), new.movie_id, 1)
+        ON CONFLICT(day, movie_id) DO UPDATE SET screenings = screenings + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_screenings_delete AFTER DELETE ON screenings BEGIN
+        UPDATE daily_screenings SET screenings = screenings - 1
+        WHERE day = SUBSTR(old.screening_date, 1, 10) AND movie_id = old.movie_id;
+        DELETE FROM daily_screenings
+        WHERE day = SUBSTR(old.screening_date, 1, 10) AND movie_id = old.movie_id
+        AND screenings <= 0;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_screenings_update AFTER UPDATE ON screenings BEGIN
+        UPDATE daily_screenings SET screenings = screenings - 1
+        WHERE day = SUBSTR(old.screening_date, 1, 10) AND movie_id = old.movie_id;
+        DELETE FROM daily_screenings
+        WHERE day = SUBSTR(old.screening_date, 1, 10) AND movie_id = old.movie_id
+        AND screenings <= 0;
+        INSERT INTO daily_screenings (day, movie_id, screenings)
+        VALUES (SUBSTR(new.screening_date, 1, 10), new.movie_id, 1)
+        ON CONFLICT(day, movie_id) DO UPDATE SET screenings = screenings + 1;
+    END;
+
+    CREATE TABLE IF NOT EXISTS movie_trigrams (
+        movie_id INTEGER,
+        field TEXT,
+        trigram TEXT,
+        PRIMARY KEY(movie_id, field, trigram)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_movie_trigrams_lookup
+        ON movie_trigrams(field, trigram);
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+        title,
+        director,
+        genre,
+        description,
+        content='movies',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_fts(rowid, title, director, genre, description)
+        VALUES (new.id, new.title, new.director, new.genre, new.description);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, director, genre, description)
+        VALUES ('delete', old.id, old.title, old.director, old.genre, old.description);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, director, genre, description)
+        VALUES ('delete', old.id, old.title, old.director, old.genre, old.description);
+        INSERT INTO movies_fts(rowid, title, director, genre, description)
+        VALUES (new.id, new.title, new.director, new.genre, new.description);
+    END;
+
+    CREATE TABLE IF NOT EXISTS vector_indexes (
+        name TEXT PRIMARY KEY,
+        embed_model TEXT,
+        dim INTEGER,
+        complete INTEGER DEFAULT 0,
+        active INTEGER DEFAULT 0,
+        quantization TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS translation_cache (
+        text_hash TEXT,
+        chat_model TEXT,
+        translation TEXT,
+        PRIMARY KEY(text_hash, chat_model)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS embedding_failures (
+        index_name TEXT,
+        movie_id INTEGER,
+        error TEXT,
+        attempts INTEGER,
+        failed_at TEXT,
+        PRIMARY KEY(index_name, movie_id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS embedding_cache (
+        text_hash TEXT,
+        embed_model TEXT,
+        embedding BLOB,
+        PRIMARY KEY(text_hash, embed_model)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS query_embeddings (
+        query TEXT,
+        embed_model TEXT,
+        embedding BLOB,
+        accessed_at REAL,
+        PRIMARY KEY(query, embed_model)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_query_embeddings_accessed
+        ON query_embeddings(accessed_at);
+
+    -- data_generation moves with every committed data write; cached query
+    -- results are valid only for the generation they were computed at.
+    CREATE TABLE IF NOT EXISTS counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER
+    );
+
+    INSERT INTO counters (name, value) VALUES
+        ('data_generation', 0),
+        ('query_cache_hits', 0),
+        ('query_cache_misses', 0)
+    ON CONFLICT(name) DO NOTHING;
+
+    CREATE TABLE IF NOT EXISTS query_results (
+        key TEXT PRIMARY KEY,
+        generation INTEGER,
+        rows TEXT,
+        accessed_at REAL
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_query_results_accessed
+        ON query_results(accessed_at);
     """
 
 
 class Database:
-    def __init__(self, db_path: Path = DB_PATH):
+    def __init__(
+        self, db_path: Path = DB_PATH, query_cache_size: int = QUERY_CACHE_SIZE
+    ):
         self.db_path = db_path
+        self.query_cache_size = query_cache_size
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
         self._init_db()
 
     def _init_db(self) -> None:
-        with self.connect() as conn:
-            conn.executescript(INIT_SCHEMA)
+        conn = self._get_connection()
+        conn.execute("PRAGMA journal_mode = WAL")
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        conn.executescript(INIT_SCHEMA)
+        if "stats" not in existing:
+            self.rebuild_stats()
+        if "embeddings" in existing and "vector_indexes" not in existing:
+            # The single float[1024] table every database had before indexes
+            # were kept per model.
+            conn.execute(
+                "INSERT INTO vector_indexes (name, embed_model, dim, complete, active) "
+                "VALUES ('embeddings', NULL, 1024, 1, 1)"
+            )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(vector_indexes)")}
+        if "quantization" not in columns:
+            conn.execute("ALTER TABLE vector_indexes ADD COLUMN quantization TEXT")
+        if "movies_fts" not in existing:
+            conn.execute(
+                "INSERT INTO movies_fts(movies_fts, rank) VALUES ('rank', ?)",
+                (FTS_RANK,),
+            )
+            conn.execute("INSERT INTO movies_fts(movies_fts) VALUES ('rebuild')")
+        if conn.execute("PRAGMA user_version").fetchone()[0] < PADDED_DATES_VERSION:
+            self._pad_screening_dates()
+            conn.execute(f"PRAGMA user_version = {PADDED_DATES_VERSION}")
+        missing = conn.execute(
+            "SELECT id, title, director FROM movies m WHERE NOT EXISTS "
+            "(SELECT 1 FROM movie_trigrams t WHERE t.movie_id = m.id)"
+        ).fetchall()
+        if missing:
+            with self.transaction() as conn:
+                self._index_trigrams(conn, missing)
+
+    def _pad_screening_dates(self) -> None:
+        """Rewrite screenings stored before times were zero-padded.
+
+        A row whose padded form already exists for the same movie is a
+        duplicate and is dropped.
+        """
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, screening_date FROM screenings "
+                "WHERE LENGTH(screening_date) != 16"
+            ).fetchall()
+            for screening_id, value in rows:
+                try:
+                    padded = normalize_screening_date(value)
+                except ValueError:
+                    logger.warning(f"Unparseable screening date {value!r} kept")
+                    continue
+                conn.execute(
+                    "UPDATE OR IGNORE screenings SET screening_date = ? WHERE id = ?",
+                    (padded, screening_id),
+                )
+                conn.execute(
+                    "DELETE FROM screenings WHERE id = ? AND screening_date = ?",
+                    (screening_id, value),
+                )
+            if rows:
+                self.rebuild_stats()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path, isolation_level=None, check_same_thread=False
+        )
+        for pragma, value in DB_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        conn.enable_load_extension(True)
+        sqlite_vec.load(conn)
+        conn.enable_load_extension(False)
+        return conn
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Close every pooled connection"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
 
     @contextmanager
-    def connect(self) -> Generator[sqlite3.Connection, None, None]:
-        conn = sqlite3.connect(self.db_path)
-        create_levenshtein_function(conn)
+    def _scope(
+        self, begin: str, bump: bool = False
+    ) -> Generator[sqlite3.Connection, None, None]:
+        conn = self._get_connection()
+        if conn.in_transaction:
+            # Nested scopes join the enclosing transaction.
+            yield conn
+            return
+        conn.execute(begin)
         try:
-            conn.enable_load_extension(True)
-            sqlite_vec.load(conn)
             yield conn
-            conn.commit()
+            if bump:
+                conn.execute(
+                    "UPDATE counters SET value = value + 1 WHERE name = 'data_generation'"
+                )
+            conn.execute("COMMIT")
         except Exception as e:
             logger.error(f"Database error: {e}")
-            conn.rollback()
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
             raise
-        finally:
-            conn.close()
 
-    def get_movie(self, title: str) -> Optional[int]:
-        query = """
-        SELECT m.id
-        FROM movies m INNER JOIN screenings s ON m.id = s.movie_id
-        WHERE title = ? AND ABS(CAST(JULIANDAY('now') AS INTEGER) - CAST(JULIANDAY(screening_date) AS INTEGER)) < 5
-        ORDER BY ABS(CAST(JULIANDAY('now') AS INTEGER) - CAST(JULIANDAY(screening_date) AS INTEGER))
-        LIMIT 1;
-        """
-        with self.connect() as conn:
-            result = conn.execute(query, (title,)).fetchone()
-            return result[0] if result else None
-
-    def add_movie(self, movie: Movie) -> int:
-        query = """
-        INSERT INTO movies (title, duration, director, genre, production, description, href)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(title, director) DO UPDATE SET
-            duration=excluded.duration,
-            genre=excluded.genre,
-            production=excluded.production,
-            description=excluded.description,
-            href=excluded.href
-        RETURNING id
-        """
+    def data_generation(self) -> int:
+        """Counter bumped by every committed data write, in any process"""
         with self.connect() as conn:
-            movie_id = conn.execute(
-                query,
-                (
-                    movie.title,
-                    movie.duration,
-                    movie.director,
-                    movie.genre,
-                    movie.production,
-                    movie.description,
-                    movie.href,
-                ),
+            return conn.execute(
+                "SELECT value FROM counters WHERE name = 'data_generation'"
             ).fetchone()[0]
-            return movie_id
 
-    def clear_date_screenings(self, date: str) -> None:
-        """Clear all screenings for a specific date"""
-        query = """
-        DELETE FROM screenings
-        WHERE DATE(screening_date) = DATE(?);
+    def _cached(
+        self, key: list, compute: Callable[[], list[MovieRow]]
+    ) -> list[MovieRow]:
+        """Rows of a query from the result cache, computing them on a miss"""
+        rows = None
+        if self.query_cache_size > 0:
+            key = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+            generation = self.data_generation()
+            rows = self.get_query_result(key, generation)
+        if rows is None:
+            rows = compute()
+            if self.query_cache_size > 0:
+                self.add_query_result(key, generation, rows)
+        return rows
+
+    @contextmanager
+    def connect(self) -> Generator[sqlite3.Connection, None, None]:
+        """Read scope on the thread's pooled connection"""
+        with self._scope("BEGIN") as conn:
+            yield conn
+
+    @contextmanager
+    def transaction(
+        self, bump: bool = True
+    ) -> Generator[sqlite3.Connection, None, None]:
+        """Write scope; takes the write lock up front so concurrent writers wait.
+
+        bump=False is for writes that only touch cache bookkeeping and leave
+        cached query results valid.
         """
-        with self.connect() as conn:
-            conn.execute(query, (date,))
+        with self._scope("BEGIN IMMEDIATE", bump) as conn:
+            yield conn
 
-    def clear_scraped_date(self, date: str) -> None:
-        """Remove date from scraped_dates table"""
-        query = "DELETE FROM scraped_dates WHERE date = ?;"
+    def get_movie_ids_by_href(self) -> dict[str, int]:
+        """Map every stored detail-page URL to its most recent movie id"""
+        query = "SELECT href, MAX(id) FROM movies WHERE href IS NOT NULL GROUP BY href"
         with self.connect() as conn:
-            conn.execute(query, (date,))
+            return dict(conn.execute(query).fetchall())
 
-    def add_screenings(self, screenings: list[Screening]) -> None:
-        query = """
-        INSERT INTO screenings (movie_id, screening_date)
-        VALUES (?, ?)
-        ON CONFLICT(movie_id, screening_date) DO NOTHING
+    @staticmethod
+    def _index_trigrams(
+        conn: sqlite3.Connection,
+        movies: list[tuple[int, Optional[str], Optional[str]]],
+    ) -> None:
+        conn.executemany(
+            "DELETE FROM movie_trigrams WHERE movie_id = ?",
+            [(movie_id,) for movie_id, _, _ in movies],
+        )
+        conn.executemany(
+            "INSERT INTO movie_trigrams (movie_id, field, trigram) VALUES (?, ?, ?)",
+            [
+                (movie_id, field, trigram)
+                for movie_id, title, director in movies
+                for field, value in (("title", title), ("director", director))
+                if value
+                for trigram in trigrams(value)
+            ],
+        )
+
+    def ingest_day(
+        self, date: str, entries: list[ProgrammeEntry], reconcile: bool = False
+    ) -> DayChanges:
+        """Store one scraped programme day and mark it scraped in one transaction.
+
+        Only screenings missing from the day are inserted. With reconcile=True
+        stored screenings absent from the scrape are deleted as well.
         """
+        # A film listed twice on one day is upserted and trigram-indexed once.
+        new_movies = list(
+            {
+                (entry.movie.title, entry.movie.director): entry.movie
+                for entry in entries
+                if entry.movie_id is None
+            }.values()
+        )
+        with self.transaction() as conn:
+            conn.executemany(UPSERT_MOVIE, [movie_params(m) for m in new_movies])
+            new_ids = [
+                row[0]
+                for row in conn.execute(
+                    """
+                    SELECT (
+                        SELECT MAX(m.id)
+                        FROM movies m
+                        WHERE m.title = json_extract(j.value, '$[0]')
+                        AND m.director IS json_extract(j.value, '$[1]')
+                    )
+                    FROM json_each(?) j
+                    ORDER BY j.key
+                    """,
+                    (json.dumps([[m.title, m.director] for m in new_movies]),),
+                )
+            ]
+            self._index_trigrams(
+                conn,
+                [
+                    (movie_id, m.title, m.director)
+                    for movie_id, m in zip(new_ids, new_movies, strict=True)
+                ],
+            )
+
+            ids = {
+                (m.title, m.director): movie_id
+                for movie_id, m in zip(new_ids, new_movies, strict=True)
+            }
+            entry_ids = [
+                entry.movie_id
+                if entry.movie_id is not None
+                else ids[(entry.movie.title, entry.movie.director)]
+                for entry in entries
+            ]
+            scraped = {
+                (movie_id, s)
+                for movie_id, entry in zip(entry_ids, entries, strict=True)
+                for s in entry.screenings
+            }
+            stored = set(
+                conn.execute(
+                    """
+                    SELECT movie_id, screening_date FROM screenings
+                    WHERE screening_date >= ? AND screening_date < ?
+                    """,
+                    day_range(date),
+                ).fetchall()
+            )
+            added = sorted(scraped - stored)
+            removed = sorted(stored - scraped) if reconcile else []
+            conn.executemany(
+                "DELETE FROM screenings WHERE movie_id = ? AND screening_date = ?",
+                removed,
+            )
+            conn.executemany(
+                """
+                INSERT INTO screenings (movie_id, screening_date)
+                VALUES (?, ?)
+                ON CONFLICT(movie_id, screening_date) DO NOTHING
+                """,
+                added,
+            )
+            conn.execute(
+                "INSERT INTO scraped_dates (date) VALUES (?) ON CONFLICT(date) DO NOTHING",
+                (date,),
+            )
+        return DayChanges(date, len(added), len(removed))
+
+    def fuzzy_match(
+        self, field: str, text: str, max_distance: int = FUZZY_MAX_DISTANCE
+    ) -> dict[int, int]:
+        """Map ids of movies whose field is within max_distance edits to the distance"""
+        if field not in FUZZY_FIELDS:
+            raise ValueError(f"Fuzzy search is not supported for {field}")
+        query_text = normalize_text(text)
+        min_shared = min_shared_trigrams(query_text, max_distance)
+
         with self.connect() as conn:
-            conn.executemany(query, [(s.movie_id, s.date) for s in screenings])
+            if min_shared > 0:
+                candidates = conn.execute(
+                    f"""
+                    SELECT m.id, m.{field}
+                    FROM movies m JOIN (
+                        SELECT movie_id
+                        FROM movie_trigrams
+                        WHERE field = ? AND trigram IN (SELECT value FROM json_each(?))
+                        GROUP BY movie_id
+                        HAVING COUNT(*) >= ?
+                    ) t ON m.id = t.movie_id
+                    """,
+                    (field, json.dumps(list(trigrams(query_text))), min_shared),
+                ).fetchall()
+            else:
+                # Queries this short share too few trigrams to prune on. The
+                # length check is left to bounded_levenshtein, because stored
+                # values are only comparable after normalize_text.
+                candidates = conn.execute(
+                    f"SELECT id, {field} FROM movies WHERE {field} IS NOT NULL"
+                ).fetchall()
+
+        matches = {}
+        for movie_id, value in candidates:
+            distance = bounded_levenshtein(
+                normalize_text(value), query_text, max_distance
+            )
+            if distance is not None:
+                matches[movie_id] = distance
+        return matches
+
+    def fuzzy_rank(self, movie_filter: MovieFilter) -> dict[int, int]:
+        """Combined edit distance of movies matching every fuzzy filter field"""
+        ranking: Optional[dict[int, int]] = None
+        for field in FUZZY_FIELDS:
+            text = getattr(movie_filter, field)
+            if not text:
+                continue
+            matches = self.fuzzy_match(field, text)
+            if ranking is None:
+                ranking = matches
+            else:
+                ranking = {
+                    movie_id: distance + matches[movie_id]
+                    for movie_id, distance in ranking.items()
+                    if movie_id in matches
+                }
+        return ranking or {}
 
     def is_date_scraped(self, date: str) -> bool:
         query = "SELECT 1 FROM scraped_dates WHERE date = ?"
@@ -166,16 +635,72 @@ class Database:
             result = conn.execute(query, (date,)).fetchone()
             return bool(result)
 
-    def mark_date_scraped(self, date: str) -> None:
-        query = (
-            "INSERT INTO scraped_dates (date) VALUES (?) ON CONFLICT(date) DO NOTHING"
-        )
+    def _fetch_movies(
+        self, query: str, params: Union[tuple, list, dict], validate: bool = True
+    ) -> Union[list[MovieWithScreenings], list[MovieRow]]:
+        """Run a movie query; rows are validated into models only when asked"""
         with self.connect() as conn:
-            conn.execute(query, (date,))
+            cursor = conn.cursor()
+            cursor.row_factory = movie_row_factory
+            rows = cursor.execute(query, params).fetchall()
+        if validate:
+            return [row.to_model() for row in rows]
+        return rows
 
     def filter_movies(
-        self, where_clause: str, params: tuple
-    ) -> list[MovieWithScreenings]:
+        self, movie_filter: MovieFilter, validate: bool = True
+    ) -> Union[list[MovieWithScreenings], list[MovieRow]]:
+        bucket = movie_filter.day_bucket()
+        rows = self._cached(
+            ["filter", bucket.cache_key()], lambda: self._filter_movies(bucket)
+        )
+        if bucket is not movie_filter:
+            rows = screenings_since(rows, movie_filter.start_date)
+        if validate:
+            return [row.to_model() for row in rows]
+        return rows
+
+    def _filter_parts(
+        self, movie_filter: MovieFilter
+    ) -> Optional[tuple[str, str, list, list[str]]]:
+        """Ranking joins, WHERE clause, params and order terms of a filter.
+
+        None when the fuzzy ranking already rules out every movie.
+        """
+        where_clause, where_params = movie_filter.to_sql()
+        joins, join_params, order_terms = [], [], []
+        if movie_filter.use_fuzzy and (movie_filter.title or movie_filter.director):
+            ranking = self.fuzzy_rank(movie_filter)
+            if not ranking:
+                return None
+            joins.append("JOIN json_each(?) r ON CAST(r.key AS INTEGER) = m.id")
+            join_params.append(json.dumps(ranking))
+            order_terms.append("MIN(r.value)")
+
+        fts_query = movie_filter.fts_query()
+        if fts_query:
+            joins.append(
+                """JOIN (
+                    SELECT rowid, rank FROM movies_fts WHERE movies_fts MATCH ?
+                ) f ON f.rowid = m.id"""
+            )
+            join_params.append(fts_query)
+            order_terms.append("MIN(f.rank)")
+
+        return (
+            "\n".join(joins),
+            where_clause,
+            [*join_params, *where_params],
+            order_terms,
+        )
+
+    def _filter_movies(self, movie_filter: MovieFilter) -> list[MovieRow]:
+        parts = self._filter_parts(movie_filter)
+        if parts is None:
+            return []
+        ranking_join, where_clause, params, order_terms = parts
+        order_by = f"ORDER BY {', '.join(order_terms)}, m.title" if order_terms else ""
+
         query = f"""
         SELECT DISTINCT
             m.title,
@@ -187,131 +712,605 @@ class Database:
             m.href,
             GROUP_CONCAT(s.screening_date, '\n') as screening_dates
         FROM movies m
+        {ranking_join}
         LEFT JOIN screenings s ON m.id = s.movie_id
         WHERE {where_clause}
         GROUP BY m.title, m.duration, m.director, m.genre, m.production, m.description, m.href
+        {order_by}
         """
 
+        return self._fetch_movies(query, params, validate=False)
+
+    def filter_movie_ids(self, movie_filter: MovieFilter) -> list[int]:
+        """Ids of the movies passing movie_filter, in no particular order"""
+        parts = self._filter_parts(movie_filter)
+        if parts is None:
+            return []
+        ranking_join, where_clause, params, _ = parts
+        with self.connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT DISTINCT m.id
+                FROM movies m
+                {ranking_join}
+                LEFT JOIN screenings s ON m.id = s.movie_id
+                WHERE {where_clause}
+                """,
+                params,
+            ).fetchall()
+        return [movie_id for (movie_id,) in rows]
+
+    def _index_from_row(self, row) -> VectorIndex:
+        name, embed_model, dim, complete, active, quantization = row
+        return VectorIndex(
+            name, embed_model, dim, bool(complete), bool(active), quantization
+        )
+
+    def get_vector_indexes(self) -> list[VectorIndex]:
+        with self.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT name, embed_model, dim, complete, active, quantization
+                FROM vector_indexes
+                """
+            ).fetchall()
+        return [self._index_from_row(row) for row in rows]
+
+    def get_active_index(self) -> Optional[VectorIndex]:
+        return next((i for i in self.get_vector_indexes() if i.active), None)
+
+    def get_index_for_model(self, embed_model: str) -> Optional[VectorIndex]:
+        """Most recently registered index built with embed_model"""
         with self.connect() as conn:
-            results = conn.execute(query, params).fetchall()
+            row = conn.execute(
+                """
+                SELECT name, embed_model, dim, complete, active, quantization
+                FROM vector_indexes
+                WHERE embed_model = ? ORDER BY rowid DESC LIMIT 1
+                """,
+                (embed_model,),
+            ).fetchone()
+        return self._index_from_row(row) if row else None
 
-        movies = [
-            MovieWithScreenings(
-                **{
-                    key: row[i]
-                    for i, key in enumerate(MovieWithScreenings.model_fields.keys())
+    def create_vector_index(
+        self, embed_model: str, dim: int, quantization: Optional[str] = None
+    ) -> VectorIndex:
+        """Register a new, empty vec0 table for embed_model's dim-sized vectors"""
+        slug = re.sub(r"[^a-z0-9]+", "_", embed_model.lower()).strip("_")
+        with self.transaction() as conn:
+            version = conn.execute(
+                "SELECT COALESCE(MAX(rowid), 0) + 1 FROM vector_indexes"
+            ).fetchone()[0]
+            name = f"embeddings_{slug}_{int(dim)}_{version}"
+            conn.execute(
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING vec0(
+                    movie_id integer primary key,
+                    embedding float[{int(dim)}]
+                )
+                """
+            )
+            conn.execute(
+                """
+                INSERT INTO vector_indexes (name, embed_model, dim) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO NOTHING
+                """,
+                (name, embed_model, dim),
+            )
+        index = next(i for i in self.get_vector_indexes() if i.name == name)
+        if quantization:
+            self.quantize_vector_index(index, quantization)
+            index = index._replace(quantization=quantization)
+        return index
+
+    def quantize_vector_index(
+        self, index: VectorIndex, quantization: Optional[str]
+    ) -> None:
+        """Build (or with None drop) the quantized coarse copy of an index.
+
+        KNN then scans the compact copy and reranks its best candidates with
+        the exact float32 vectors.
+        """
+        with self.transaction() as conn:
+            if index.coarse_table:
+                conn.execute(f"DROP TABLE IF EXISTS {index.coarse_table}")
+            if quantization:
+                column, quantize = QUANTIZERS[quantization]
+                coarse = index._replace(quantization=quantization).coarse_table
+                conn.execute(
+                    f"""
+                    CREATE VIRTUAL TABLE {coarse} USING vec0(
+                        movie_id integer primary key,
+                        embedding {column}[{int(index.dim)}]
+                    )
+                    """
+                )
+                conn.execute(
+                    f"""
+                    INSERT INTO {coarse} (movie_id, embedding)
+                    SELECT movie_id, {quantize.format("embedding")} FROM {index.name}
+                    """
+                )
+            conn.execute(
+                "UPDATE vector_indexes SET quantization = ? WHERE name = ?",
+                (quantization, index.name),
+            )
+
+    def claim_vector_index(self, name: str, embed_model: str) -> None:
+        """Record which model built an index whose model was unknown"""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE vector_indexes SET embed_model = ? "
+                "WHERE name = ? AND embed_model IS NULL",
+                (embed_model, name),
+            )
+
+    def activate_vector_index(self, name: str) -> None:
+        """Make an index the only active one, atomically.
+
+        Older indexes of the same model are dropped; other models' indexes are
+        kept so switching back to them needs no rebuild.
+        """
+        with self.transaction() as conn:
+            conn.execute(
+                """
+                UPDATE vector_indexes SET
+                    complete = complete OR name = :name,
+                    active = name = :name
+                """,
+                {"name": name},
+            )
+            superseded = conn.execute(
+                """
+                DELETE FROM vector_indexes
+                WHERE name != :name AND embed_model = (
+                    SELECT embed_model FROM vector_indexes WHERE name = :name
+                )
+                RETURNING name, quantization
+                """,
+                {"name": name},
+            ).fetchall()
+            for table, quantization in superseded:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                if quantization:
+                    conn.execute(f"DROP TABLE IF EXISTS {table}_{quantization}")
+                conn.execute(
+                    "DELETE FROM embedding_failures WHERE index_name = ?", (table,)
+                )
+
+    def count_index_entries(self, index: VectorIndex) -> int:
+        with self.connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {index.name}").fetchone()[0]
+
+    def get_movies_needing_embeddings(
+        self, index: VectorIndex, after_id: int = 0, limit: int = -1
+    ) -> list[tuple[int, str]]:
+        """(id, text) of movies missing from index, in id order after after_id"""
+        query = f"""
+        SELECT id, 'Gatunek: ' || COALESCE(genre, '')
+            || ' Reżyser: ' || COALESCE(director, '')
+            || ' Opis: ' || COALESCE(description, '')
+        FROM movies
+        WHERE id > ? AND NOT EXISTS (
+            SELECT 1 FROM {index.name} WHERE movie_id = id
+        )
+        ORDER BY id
+        LIMIT ?;
+        """
+        with self.connect() as conn:
+            return conn.execute(query, (after_id, limit)).fetchall()
+
+    def count_movies_needing_embeddings(self, index: VectorIndex) -> int:
+        query = f"""
+        SELECT COUNT(*) FROM movies
+        WHERE NOT EXISTS (SELECT 1 FROM {index.name} WHERE movie_id = id)
+        """
+        with self.connect() as conn:
+            return conn.execute(query).fetchone()[0]
+
+    def store_embedding_results(
+        self,
+        index: VectorIndex,
+        embeddings: list[tuple[int, np.ndarray]],
+        failures: list[tuple[int, str]],
+    ) -> None:
+        """Write a batch of embeddings and record failed movies for a later retry"""
+        with self.transaction() as conn:
+            conn.executemany(
+                f"""
+                INSERT INTO {index.name} (movie_id, embedding)
+                SELECT :movie_id, :embedding
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {index.name} WHERE movie_id = :movie_id
+                )
+                """,
+                [
+                    {"movie_id": movie_id, "embedding": to_blob(embedding)}
+                    for movie_id, embedding in embeddings
+                ],
+            )
+            if index.coarse_table:
+                # vec0 drops the quantized subtype of values filtered by a
+                # WHERE clause, so skip already stored movies here instead.
+                # Only equality on the primary key is a point lookup in vec0;
+                # IN lists scan the whole table.
+                _, quantize = QUANTIZERS[index.quantization]
+                lookup = f"SELECT 1 FROM {index.coarse_table} WHERE movie_id = ?"
+                stored = {
+                    movie_id
+                    for movie_id, _ in embeddings
+                    if conn.execute(lookup, (movie_id,)).fetchone()
                 }
+                conn.executemany(
+                    f"""
+                    INSERT INTO {index.coarse_table} (movie_id, embedding)
+                    VALUES (?, {quantize.format("?")})
+                    """,
+                    [
+                        (movie_id, to_blob(embedding))
+                        for movie_id, embedding in embeddings
+                        if movie_id not in stored
+                    ],
+                )
+            conn.executemany(
+                "DELETE FROM embedding_failures WHERE index_name = ? AND movie_id = ?",
+                [(index.name, movie_id) for movie_id, _ in embeddings],
+            )
+            conn.executemany(
+                """
+                INSERT INTO embedding_failures
+                    (index_name, movie_id, error, attempts, failed_at)
+                VALUES (?, ?, ?, 1, datetime('now'))
+                ON CONFLICT(index_name, movie_id) DO UPDATE SET
+                    error=excluded.error,
+                    attempts=attempts + 1,
+                    failed_at=excluded.failed_at
+                """,
+                [(index.name, movie_id, error) for movie_id, error in failures],
             )
-            for row in results
-        ]
-        return movies
 
-    def get_movies_needing_embeddings(self) -> list[tuple[int, str]]:
+    def count_embedding_failures(self, index: VectorIndex) -> int:
+        with self.connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM embedding_failures WHERE index_name = ?",
+                (index.name,),
+            ).fetchone()[0]
+
+    def get_cached_translations(
+        self, text_hashes: list[str], chat_model: str
+    ) -> dict[str, str]:
         query = """
-        SELECT id, CONCAT('Gatunek: ', genre, ' Reżyser: ', director, ' Opis: ', description)
-        FROM movies
-        WHERE NOT EXISTS (
-            SELECT 1 FROM embeddings WHERE movie_id = id
-        );
+        SELECT text_hash, translation FROM translation_cache
+        WHERE chat_model = ? AND text_hash IN (SELECT value FROM json_each(?))
         """
         with self.connect() as conn:
-            return conn.execute(query).fetchall()
+            return dict(conn.execute(query, (chat_model, json.dumps(text_hashes))))
 
-    def add_movie_embedding(self, movie_id: int, embedding: list[float]) -> None:
+    def add_cached_translations(
+        self, chat_model: str, translations: dict[str, str]
+    ) -> None:
         query = """
-        INSERT INTO embeddings (movie_id, embedding)
-        VALUES (?, ?);
+        INSERT INTO translation_cache (text_hash, chat_model, translation)
+        VALUES (?, ?, ?)
+        ON CONFLICT(text_hash, chat_model) DO UPDATE SET translation=excluded.translation
+        """
+        with self.transaction(bump=False) as conn:
+            conn.executemany(
+                query, [(h, chat_model, t) for h, t in translations.items()]
+            )
+
+    def get_cached_embeddings(
+        self, text_hashes: list[str], embed_model: str
+    ) -> dict[str, np.ndarray]:
+        query = """
+        SELECT text_hash, embedding FROM embedding_cache
+        WHERE embed_model = ? AND text_hash IN (SELECT value FROM json_each(?))
         """
         with self.connect() as conn:
-            conn.execute(query, (movie_id, sqlite_vec.serialize_float32(embedding)))
+            return {
+                text_hash: from_blob(blob)
+                for text_hash, blob in conn.execute(
+                    query, (embed_model, json.dumps(text_hashes))
+                )
+            }
 
-    def get_similar_movies(
-        self, embedding: list[float], limit: int = 5
-    ) -> list[MovieWithScreenings]:
+    def add_cached_embeddings(
+        self, embed_model: str, embeddings: dict[str, np.ndarray]
+    ) -> None:
         query = """
-        SELECT title, duration, director, genre, production, description, href, GROUP_CONCAT(s.screening_date, '\n') as screenings
-        FROM movies m
-        JOIN embeddings d ON m.id = d.movie_id
-        LEFT JOIN screenings s ON m.id = s.movie_id
-        WHERE embedding MATCH ?
-        AND k = ?
-        GROUP BY m.title, m.duration, m.director, m.genre, m.production, m.description, href
-        ORDER BY distance;
+        INSERT INTO embedding_cache (text_hash, embed_model, embedding)
+        VALUES (?, ?, ?)
+        ON CONFLICT(text_hash, embed_model) DO UPDATE SET embedding=excluded.embedding
         """
+        with self.transaction(bump=False) as conn:
+            conn.executemany(
+                query,
+                [(h, embed_model, to_blob(e)) for h, e in embeddings.items()],
+            )
+
+    def get_query_embedding(self, query: str, embed_model: str) -> Optional[np.ndarray]:
+        """Cached embedding of a recommendation query, marking it recently used"""
+        with self.transaction(bump=False) as conn:
+            row = conn.execute(
+                """
+                UPDATE query_embeddings SET accessed_at = ?
+                WHERE query = ? AND embed_model = ?
+                RETURNING embedding
+                """,
+                (time.time(), query, embed_model),
+            ).fetchone()
+        return from_blob(row[0]) if row else None
+
+    def add_query_embedding(
+        self,
+        query: str,
+        embed_model: str,
+        embedding: np.ndarray,
+        max_entries: int = QUERY_EMBEDDING_CACHE_SIZE,
+    ) -> None:
+        with self.transaction(bump=False) as conn:
+            conn.execute(
+                """
+                INSERT INTO query_embeddings (query, embed_model, embedding, accessed_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(query, embed_model) DO UPDATE SET
+                    embedding=excluded.embedding,
+                    accessed_at=excluded.accessed_at
+                """,
+                (query, embed_model, to_blob(embedding), time.time()),
+            )
+            conn.execute(
+                """
+                DELETE FROM query_embeddings WHERE accessed_at < (
+                    SELECT accessed_at FROM query_embeddings
+                    ORDER BY accessed_at DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (max_entries - 1,),
+            )
+
+    def count_query_embeddings(self) -> int:
         with self.connect() as conn:
-            results = conn.execute(
-                query, (sqlite_vec.serialize_float32(embedding), limit)
-            ).fetchall()
-            return [
-                MovieWithScreenings(
-                    **{
-                        key: row[i]
-                        for i, key in enumerate(MovieWithScreenings.model_fields.keys())
-                    }
+            return conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+    def clear_query_embeddings(self) -> None:
+        with self.transaction(bump=False) as conn:
+            conn.execute("DELETE FROM query_embeddings")
+
+    def get_query_result(self, key: str, generation: int) -> Optional[list[MovieRow]]:
+        """Cached rows of a query computed at generation, counting the hit or miss"""
+        with self.transaction(bump=False) as conn:
+            row = conn.execute(
+                """
+                UPDATE query_results SET accessed_at = ?
+                WHERE key = ? AND generation = ?
+                RETURNING rows
+                """,
+                (time.time(), key, generation),
+            ).fetchone()
+            conn.execute(
+                "UPDATE counters SET value = value + 1 WHERE name = ?",
+                ("query_cache_hits" if row else "query_cache_misses",),
+            )
+        return [MovieRow._make(r) for r in json.loads(row[0])] if row else None
+
+    def add_query_result(self, key: str, generation: int, rows: list[MovieRow]) -> None:
+        """Store a query's rows, dropping stale and least recently used results"""
+        with self.transaction(bump=False) as conn:
+            conn.execute(
+                """
+                INSERT INTO query_results (key, generation, rows, accessed_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    generation=excluded.generation,
+                    rows=excluded.rows,
+                    accessed_at=excluded.accessed_at
+                """,
+                (key, generation, json.dumps(rows), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM query_results WHERE generation < ?", (generation,)
+            )
+            conn.execute(
+                """
+                DELETE FROM query_results WHERE accessed_at < (
+                    SELECT accessed_at FROM query_results
+                    ORDER BY accessed_at DESC LIMIT 1 OFFSET ?
                 )
-                for row in results
-            ]
+                """,
+                (self.query_cache_size - 1,),
+            )
+
+    def query_cache_stats(self) -> dict:
+        with self.connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters"))
+            size = conn.execute("SELECT COUNT(*) FROM query_results").fetchone()[0]
+        return {
+            "hits": counters["query_cache_hits"],
+            "misses": counters["query_cache_misses"],
+            "size": size,
+            "maxsize": self.query_cache_size,
+        }
+
+    def clear_query_results(self) -> None:
+        with self.transaction(bump=False) as conn:
+            conn.execute("DELETE FROM query_results")
+            conn.execute(
+                "UPDATE counters SET value = 0 "
+                "WHERE name IN ('query_cache_hits', 'query_cache_misses')"
+            )
+
+    def get_similar_movies(
+        self,
+        index: VectorIndex,
+        embedding: np.ndarray,
+        limit: int = 5,
+        validate: bool = True,
+        movie_filter: Optional[MovieFilter] = None,
+    ) -> Union[list[MovieWithScreenings], list[MovieRow]]:
+        """The limit nearest movies, among those passing movie_filter if given"""
+        blob = to_blob(embedding)
+        bucket = movie_filter.day_bucket() if movie_filter else None
+        rows = self._cached(
+            [
+                "similar",
+                index,
+                hashlib.sha256(blob).hexdigest(),
+                limit,
+                bucket.cache_key() if bucket else None,
+            ],
+            lambda: self._similar_movies(index, blob, limit, bucket),
+        )
+        if bucket is not movie_filter:
+            kept = screenings_since(rows, movie_filter.start_date)
+            # A film screening only earlier today took one of the k places, so
+            # the nearest films of the exact filter have to be searched again.
+            if len(kept) < len(rows):
+                kept = self._similar_movies(index, blob, limit, movie_filter)
+            rows = kept
+        if validate:
+            return [row.to_model() for row in rows]
+        return rows
+
+    def _similar_movies(
+        self,
+        index: VectorIndex,
+        blob: np.ndarray,
+        limit: int,
+        movie_filter: Optional[MovieFilter],
+    ) -> list[MovieRow]:
+        params = {
+            "embedding": blob,
+            "k": limit,
+            "candidates": limit * RERANK_OVERSAMPLE,
+        }
+        # vec0 applies the candidate ids inside the KNN, so k counts only
+        # movies that pass the filter.
+        prefilter, window = "", "1=1"
+        if movie_filter is not None:
+            movie_ids = self.filter_movie_ids(movie_filter)
+            if not movie_ids:
+                return []
+            prefilter = "AND movie_id IN (SELECT value FROM json_each(:movie_ids))"
+            params["movie_ids"] = json.dumps(movie_ids)
+            # List only the screenings inside the window, as filter_movies does.
+            window, window_params = movie_filter.screening_window()
+            params.update(window_params)
 
-    def get_movies_with_k_screenings(self, limit: int = 5) -> list[MovieWithScreenings]:
+        if index.coarse_table:
+            # Coarse KNN on the quantized copy, exact rerank of the candidates.
+            _, quantize = QUANTIZERS[index.quantization]
+            nearest = f"""
+            SELECT e.movie_id, vec_distance_l2(e.embedding, :embedding) AS distance
+            FROM (
+                SELECT movie_id FROM {index.coarse_table}
+                WHERE embedding MATCH {quantize.format(":embedding")}
+                AND k = :candidates {prefilter}
+            ) c
+            JOIN {index.name} e ON e.movie_id = c.movie_id
+            ORDER BY distance
+            LIMIT :k
+            """
+        else:
+            nearest = f"""
+            SELECT movie_id, distance FROM {index.name}
+            WHERE embedding MATCH :embedding AND k = :k {prefilter}
+            """
         query = f"""
-        SELECT title, duration, director, genre, production, description, href, screening as screenings
-        FROM movies m inner join (
-            SELECT m.id, GROUP_CONCAT(screening_date) as screening, count(*)
-            FROM movies m INNER JOIN screenings s ON m.id = s.movie_id
-            WHERE screening_date >= CURRENT_DATE
-            GROUP BY m.id
-            HAVING count(*) = {limit}
-        ) t ON m.id = t.id
-        GROUP BY title, duration, director, production, description, href
+        SELECT title, duration, director, genre, production, description, href, GROUP_CONCAT(s.screening_date, '\n') as screenings
+        FROM ({nearest}) d
+        JOIN movies m ON m.id = d.movie_id
+        LEFT JOIN screenings s ON m.id = s.movie_id AND {window}
+        GROUP BY m.id
+        ORDER BY MIN(d.distance);
         """
-        with self.connect() as conn:
-            results = conn.execute(query).fetchall()
+        return self._fetch_movies(query, params, validate=False)
 
-        movies = [
-            MovieWithScreenings(
-                **{
-                    key: row[i]
-                    for i, key in enumerate(MovieWithScreenings.model_fields.keys())
-                }
+    def get_movies_with_k_screenings(
+        self, min_k: int, max_k: Optional[int] = None, validate: bool = True
+    ) -> Union[list[MovieWithScreenings], list[MovieRow]]:
+        """Movies with min_k..max_k future screenings (max_k=None is unbounded)"""
+        query = """
+        WITH counts AS (
+            SELECT movie_id, SUM(screenings) AS screening_count
+            FROM daily_screenings
+            WHERE day >= :today
+            GROUP BY movie_id
+            HAVING screening_count >= :min_k
+            AND (:max_k IS NULL OR screening_count <= :max_k)
+        )
+        SELECT
+            m.title,
+            m.duration,
+            m.director,
+            m.genre,
+            m.production,
+            m.description,
+            m.href,
+            (
+                SELECT GROUP_CONCAT(s.screening_date, '\n')
+                FROM screenings s
+                WHERE s.movie_id = m.id AND s.screening_date >= :today
+            ) AS screenings
+        FROM counts c
+        JOIN movies m ON m.id = c.movie_id
+        ORDER BY c.screening_count DESC, m.title
+        """
+        params = {"today": today(), "min_k": min_k, "max_k": max_k}
+        return self._fetch_movies(query, params, validate)
+
+    def rebuild_stats(self) -> None:
+        """Recompute the trigger-maintained statistics from scratch"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM daily_screenings")
+            conn.execute(
+                """
+                INSERT INTO daily_screenings (day, movie_id, screenings)
+                SELECT SUBSTR(screening_date, 1, 10), movie_id, COUNT(*)
+                FROM screenings
+                GROUP BY 1, 2
+                """
+            )
+            conn.execute("DELETE FROM stats")
+            conn.execute(
+                """
+                INSERT INTO stats (name, value) VALUES
+                    ('total_movies', (SELECT COUNT(*) FROM movies)),
+                    ('last_scraped', (SELECT MAX(date) FROM scraped_dates))
+                """
             )
-            for row in results
-        ]
-        return movies
 
     def get_detailed_stats(self) -> dict:
+        """Read the counters kept by the stats triggers.
+
+        Future figures only aggregate daily_screenings from today on, so the
+        cost follows the programme horizon rather than the whole history.
+        """
         query = """
-        WITH stats AS (
-            SELECT
-                COUNT(DISTINCT m.id) as total_movies,
-                COUNT(DISTINCT CASE
-                    WHEN s.screening_date >= date('now')
-                    THEN m.id
-                END) as future_movies,
-                COUNT(CASE WHEN s.screening_date >= date('now') THEN 1 END) as future_screenings,
-                MAX(sd.date) as last_scraped_date
-            FROM movies m
-            LEFT JOIN screenings s ON m.id = s.movie_id
-            CROSS JOIN (SELECT MAX(date) as date FROM scraped_dates) sd
+        WITH future AS (
+            SELECT movie_id, SUM(screenings) AS screenings
+            FROM daily_screenings
+            WHERE day >= :today
+            GROUP BY movie_id
         ),
         popular_movie AS (
-            SELECT
-                m.title,
-                COUNT(*) as screening_count
-            FROM movies m
-            JOIN screenings s ON m.id = s.movie_id
-            WHERE s.screening_date >= date('now')
-            GROUP BY m.id, m.title
-            ORDER BY screening_count DESC
+            SELECT movie_id, screenings FROM future
+            ORDER BY screenings DESC
             LIMIT 1
         )
         SELECT
-            stats.*,
-            pm.title as most_popular,
-            pm.screening_count
-        FROM stats, popular_movie pm;
+            (SELECT value FROM stats WHERE name = 'total_movies'),
+            (SELECT COUNT(*) FROM future),
+            (SELECT COALESCE(SUM(screenings), 0) FROM future),
+            (SELECT value FROM stats WHERE name = 'last_scraped'),
+            m.title,
+            pm.screenings
+        FROM (SELECT 1)
+        LEFT JOIN popular_movie pm ON 1
+        LEFT JOIN movies m ON m.id = pm.movie_id;
         """
         with self.connect() as conn:
-            row = conn.execute(query).fetchone()
+            row = conn.execute(query, {"today": today()}).fetchone()
             return {
                 "total_movies": row[0],
                 "future_movies": row[1],
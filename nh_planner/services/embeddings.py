@@ -1,13 +1,29 @@
 import asyncio
+import hashlib
 import json
+import logging
 from pathlib import Path
+from typing import AsyncIterator, Optional
 
+import numpy as np
 from ollama import AsyncClient, Client
 from tqdm.asyncio import tqdm
 
+from nh_planner.core.config import EMBED_BATCH_SIZE, EMBED_CHUNK_SIZE, EMBED_FLUSH_SIZE
+from nh_planner.core.models import VectorIndex
+from nh_planner.services.filters import MovieFilter
+from nh_planner.services.fuzzy import normalize_text
+from nh_planner.services.vectors import as_matrix, normalize
+
+logger = logging.getLogger(__name__)
+
 CONFIG_PATH = Path("~/.config/kinonh/models.json").expanduser()
 
 
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
 def load_models_config() -> dict[str, str]:
     if not CONFIG_PATH.exists():
         return {"chat_model": "llama3.2", "embed_model": "mxbai-embed-large"}
@@ -20,24 +36,32 @@ def save_models_config(config):
 
 
 class EmbeddingService:
-    def __init__(self, db):
+    def __init__(self, db, batch_size: int = EMBED_BATCH_SIZE):
         self.db = db
         config = load_models_config()
         self.chat_model = config["chat_model"]
         self.embed_model = config["embed_model"]
+        self.batch_size = batch_size
+        self._client: Optional[Client] = None
+
+    @property
+    def client(self) -> Client:
+        if self._client is None:
+            self._client = Client()
+        return self._client
 
     @staticmethod
-    def normalize(embedding: list[float]) -> list[float]:
-        norm = sum([x**2 for x in embedding]) ** 0.5
-        return [x / norm for x in embedding]
+    def normalize(embeddings) -> np.ndarray:
+        """Unit-length float32 rows from an embed response's vectors"""
+        return normalize(as_matrix(embeddings))
 
-    def sync_embed(self, text: str) -> list[float]:
-        response = Client().embeddings(prompt=text, model=self.embed_model)
-        return self.normalize(response.embedding)
+    def sync_embed(self, text: str, embed_model: Optional[str] = None) -> np.ndarray:
+        response = self.client.embed(model=embed_model or self.embed_model, input=text)
+        return self.normalize(response.embeddings)[0]
 
-    async def process_single(
+    async def translate(
         self, text: str, client: AsyncClient, sem: asyncio.Semaphore
-    ) -> list[float]:
+    ) -> str:
         async with sem:
             response = await client.chat(
                 model=self.chat_model,
@@ -52,32 +76,189 @@ class EmbeddingService:
                     },
                 ],
             )
-            translation = response.message.content.strip()
-            emb_response = await client.embeddings(
-                model=self.embed_model, prompt=translation
-            )
-            embedding = self.normalize(emb_response.embedding)
-            return embedding
+            return response.message.content.strip()
+
+    async def embed_batch(
+        self, texts: list[str], client: AsyncClient, embed_model: str
+    ) -> list[tuple[Optional[np.ndarray], Optional[str]]]:
+        """(embedding, error) per text from one request; if it fails, the texts
+        are retried one by one"""
+        try:
+            response = await client.embed(model=embed_model, input=texts)
+            return [
+                (embedding, None) for embedding in self.normalize(response.embeddings)
+            ]
+        except Exception as e:
+            if len(texts) == 1:
+                return [(None, f"Embedding failed: {e}")]
+            logger.warning(f"Batch of {len(texts)} failed ({e}), embedding singly")
+            return [
+                result
+                for text in texts
+                for result in await self.embed_batch([text], client, embed_model)
+            ]
 
-    async def process_texts(
-        self, texts: list[str], max_concurrent: int = 2
-    ) -> list[list[float]]:
+    async def embed_texts(
+        self,
+        items: list[tuple[int, str]],
+        embed_model: str,
+        max_concurrent: int = 2,
+    ) -> AsyncIterator[tuple[int, Optional[np.ndarray], Optional[str]]]:
+        """Yield (key, embedding, error) for each (key, text) as soon as it is done.
+
+        Translations are cached by (source text, chat model) and embeddings by
+        (translated text, embed model), so only unseen texts reach Ollama.
+        Translated texts are embedded in batches as they complete.
+        """
         sem = asyncio.Semaphore(max_concurrent)
         client = AsyncClient()
+        source_hashes = {key: text_hash(text) for key, text in items}
+        cached = self.db.get_cached_translations(
+            list(set(source_hashes.values())), self.chat_model
+        )
+        translated: dict[str, str] = {}
+
+        async def translation(key: int, text: str):
+            if source_hashes[key] in cached:
+                return key, cached[source_hashes[key]], None
+            try:
+                result = await self.translate(text, client, sem)
+            except Exception as e:
+                return key, None, f"Translation failed: {e}"
+            translated[source_hashes[key]] = result
+            return key, result, None
+
+        async def embed(ready: list[tuple[int, str]]):
+            self.db.add_cached_translations(self.chat_model, translated)
+            translated.clear()
+            sources = {text_hash(text): text for _, text in ready}
+            embeddings = self.db.get_cached_embeddings(list(sources), embed_model)
+            missing = [h for h in sources if h not in embeddings]
+            errors = {}
+            if missing:
+                results = await self.embed_batch(
+                    [sources[h] for h in missing], client, embed_model
+                )
+                embedded = {}
+                for h, (embedding, error) in zip(missing, results, strict=True):
+                    if embedding is None:
+                        errors[h] = error
+                    else:
+                        embedded[h] = embedding
+                self.db.add_cached_embeddings(embed_model, embedded)
+                embeddings.update(embedded)
+            return [
+                (key, embeddings.get(text_hash(text)), errors.get(text_hash(text)))
+                for key, text in ready
+            ]
+
+        ready = []
+        for done in asyncio.as_completed([translation(k, t) for k, t in items]):
+            key, text, error = await done
+            if text is None:
+                yield key, None, error
+                continue
+            ready.append((key, text))
+            if len(ready) >= self.batch_size:
+                for result in await embed(ready):
+                    yield result
+                ready = []
+        if ready:
+            for result in await embed(ready):
+                yield result
+
+    def active_index(self) -> Optional[VectorIndex]:
+        index = self.db.get_active_index()
+        if index and index.embed_model is None:
+            # Built before indexes were tracked per model, always with the
+            # configured one.
+            self.db.claim_vector_index(index.name, self.embed_model)
+            index = index._replace(embed_model=self.embed_model)
+        return index
+
+    def create_index(self, quantization: Optional[str] = None) -> VectorIndex:
+        """New empty index for the configured embed model, sized by a probe"""
+        dim = len(self.sync_embed("dimension probe"))
+        return self.db.create_vector_index(self.embed_model, dim, quantization)
+
+    async def process_pending_embeddings(
+        self, index: Optional[VectorIndex] = None
+    ) -> None:
+        """Embed movies missing from index, by default the active one.
+
+        Movies are read in id-ordered chunks and results are written in batched
+        transactions as they complete, so an interrupted run keeps its progress.
+        Failed movies are recorded in embedding_failures and retried next run.
+        """
+        if index is None:
+            index = self.active_index()
+        if index is None:
+            index = self.create_index()
+            self.db.activate_vector_index(index.name)
+
+        embeddings: list[tuple[int, np.ndarray]] = []
+        failures: list[tuple[int, str]] = []
+
+        def flush():
+            self.db.store_embedding_results(index, embeddings, failures)
+            embeddings.clear()
+            failures.clear()
 
-        tasks = [self.process_single(text, client, sem) for text in texts]
-        results = await tqdm.gather(*tasks, ascii=True, total=len(texts))
+        total = self.db.count_movies_needing_embeddings(index)
+        after_id = 0
+        with tqdm(total=total, ascii=True) as progress:
+            while movies := self.db.get_movies_needing_embeddings(
+                index, after_id, EMBED_CHUNK_SIZE
+            ):
+                after_id = movies[-1][0]
+                async for movie_id, embedding, error in self.embed_texts(
+                    movies, index.embed_model
+                ):
+                    if embedding is None:
+                        logger.error(f"Movie {movie_id}: {error}")
+                        failures.append((movie_id, error))
+                    else:
+                        embeddings.append((movie_id, embedding))
+                    if len(embeddings) + len(failures) >= EMBED_FLUSH_SIZE:
+                        flush()
+                    progress.update()
+                flush()
 
-        return [r for r in results if not isinstance(r, Exception)]
+    async def rebuild_index(self, fresh: bool = False) -> Optional[VectorIndex]:
+        """Fill the configured model's index, resuming a previous attempt unless
+        fresh, and switch recommendations to it once every movie is embedded.
 
-    async def process_pending_embeddings(self):
-        movies = self.db.get_movies_needing_embeddings()
-        texts = [text for _, text in movies]
-        embeddings = await self.process_texts(texts)
+        Returns the index if it is now active, None if movies are still missing.
+        """
+        active = self.active_index()
+        index = None if fresh else self.db.get_index_for_model(self.embed_model)
+        if index is None:
+            index = self.create_index(active.quantization if active else None)
+        await self.process_pending_embeddings(index)
+        if self.db.count_movies_needing_embeddings(index):
+            return None
+        self.db.activate_vector_index(index.name)
+        return index._replace(complete=True, active=True)
 
-        for (movie_id, _), embedding in zip(movies, embeddings, strict=False):
-            self.db.add_movie_embedding(movie_id, embedding)
+    def embed_query(self, description: str, embed_model: str) -> np.ndarray:
+        """Embedding of a recommendation query, served from the cache if seen"""
+        query = normalize_text(description)
+        embedding = self.db.get_query_embedding(query, embed_model)
+        if embedding is None:
+            embedding = self.sync_embed(query, embed_model)
+            self.db.add_query_embedding(query, embed_model, embedding)
+        return embedding
 
-    def find_similar_movies(self, description: str, limit: int = 5):
-        embedding = self.sync_embed(description)
-        return self.db.get_similar_movies(embedding, limit)
+    def find_similar_movies(
+        self,
+        description: str,
+        limit: int = 5,
+        movie_filter: Optional[MovieFilter] = None,
+    ):
+        index = self.active_index()
+        if index is None:
+            return []
+        embedding = self.embed_query(description, index.embed_model)
+        return self.db.get_similar_movies(
+            index, embedding, limit, movie_filter=movie_filter
+        )
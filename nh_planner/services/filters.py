@@ -1,9 +1,21 @@
+import re
 from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field
 
 
+def fts_terms(text: str) -> Optional[str]:
+    """AND of quoted FTS5 prefix terms, one per word of text"""
+    words = re.findall(r"\w+", text)
+    return " AND ".join(f'"{w}"*' for w in words) or None
+
+
+TEXT_FIELDS = ("title", "director", "search")
+# Bounds of the screening date window, as (field, comparison) pairs.
+DATE_BOUNDS = (("start_date", ">="), ("end_date", "<="))
+
+
 class MovieFilter(BaseModel):
     title: Optional[str] = None
     director: Optional[str] = None
@@ -12,26 +24,38 @@ class MovieFilter(BaseModel):
     start_date: str = Field(default=datetime.now().strftime("%Y-%m-%d %H:%M"))
     end_date: Optional[str] = None
     use_fuzzy: bool = False
+    search: Optional[str] = None
+
+    def cache_key(self) -> tuple:
+        """Hashable form of the filter; text fields are case and space normalized"""
+        return tuple(
+            " ".join(value.lower().split()) if field in TEXT_FIELDS and value else value
+            for field, value in self.model_dump().items()
+        )
+
+    def day_bucket(self) -> "MovieFilter":
+        """The filter with start_date widened to the start of its day.
+
+        start_date defaults to the current minute, so results cached under the
+        widened filter stay reusable all day once screenings_since trims them.
+        """
+        if self.start_date and len(self.start_date) > len("YYYY-MM-DD"):
+            return self.model_copy(update={"start_date": self.start_date[:10]})
+        return self
 
     def to_sql(self) -> tuple[str, list]:
         conditions = ["1=1"]
         params = []
 
-        if self.title:
-            if self.use_fuzzy:
-                conditions.append("LEVENSHTEIN(LOWER(m.title), LOWER(?)) <= 3")
-                params.append(self.title)
-            else:
-                conditions.append("LOWER(m.title) LIKE LOWER(?)")
-                params.append(f"%{self.title}%")
-
-        if self.director:
-            if self.use_fuzzy:
-                conditions.append("LEVENSHTEIN(LOWER(m.director), LOWER(?)) <= 3")
-                params.append(self.director)
-            else:
-                conditions.append("LOWER(m.director) LIKE LOWER(?)")
-                params.append(f"%{self.director}%")
+        # Title, director and search text go through fts_query or, with
+        # use_fuzzy, Database.fuzzy_rank. Text without any word characters has
+        # no FTS terms and falls back to a substring match.
+        if not self.use_fuzzy:
+            for column in ("title", "director"):
+                value = getattr(self, column)
+                if value and fts_terms(value) is None:
+                    conditions.append(f"LOWER(m.{column}) LIKE LOWER(?)")
+                    params.append(f"%{value}%")
 
         if self.min_duration:
             conditions.append("m.duration >= ?")
@@ -41,12 +65,30 @@ class MovieFilter(BaseModel):
             conditions.append("m.duration <= ?")
             params.append(self.max_duration)
 
-        if self.start_date:
-            conditions.append("s.screening_date >= ?")
-            params.append(self.start_date)
+        for field, comparison in DATE_BOUNDS:
+            if value := getattr(self, field):
+                conditions.append(f"s.screening_date {comparison} ?")
+                params.append(value)
 
-        if self.end_date:
-            conditions.append("s.screening_date <= ?")
-            params.append(self.end_date)
+        return " AND ".join(conditions), params
 
+    def screening_window(self) -> tuple[str, dict]:
+        """Date window predicates on screenings s, with named parameters"""
+        conditions, params = ["1=1"], {}
+        for field, comparison in DATE_BOUNDS:
+            if value := getattr(self, field):
+                conditions.append(f"s.screening_date {comparison} :{field}")
+                params[field] = value
         return " AND ".join(conditions), params
+
+    def fts_query(self) -> Optional[str]:
+        """FTS5 MATCH expression for the text constraints, if any"""
+        terms = []
+        if not self.use_fuzzy:
+            for column in ("title", "director"):
+                value = getattr(self, column)
+                if value and (column_terms := fts_terms(value)):
+                    terms.append(f"{column} : ({column_terms})")
+        if self.search and (search_terms := fts_terms(self.search)):
+            terms.append(f"({search_terms})")
+        return " AND ".join(terms) or None
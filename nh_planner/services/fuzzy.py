@@ -0,0 +1,52 @@
+from typing import Optional
+
+FUZZY_MAX_DISTANCE = 3
+FUZZY_FIELDS = ("title", "director")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {normalize_text(text)} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def min_shared_trigrams(query: str, max_distance: int) -> int:
+    """Lower bound of trigrams a match must share with the query.
+
+    A single edit touches at most three trigrams, so any string within
+    ``max_distance`` edits keeps all but ``3 * max_distance`` of them.
+    """
+    return len(trigrams(query)) - 3 * max_distance
+
+
+def bounded_levenshtein(s1: str, s2: str, max_distance: int) -> Optional[int]:
+    """Levenshtein distance, or None as soon as it must exceed max_distance"""
+    if abs(len(s1) - len(s2)) > max_distance:
+        return None
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+    if not s1:
+        return len(s2)
+
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1, start=1):
+        # Only cells within max_distance of the diagonal can stay in bounds.
+        lo = max(1, i - max_distance)
+        hi = min(len(s2), i + max_distance)
+        current_row = [max_distance + 1] * (len(s2) + 1)
+        current_row[0] = i
+        for j in range(lo, hi + 1):
+            current_row[j] = min(
+                previous_row[j] + 1,
+                current_row[j - 1] + 1,
+                previous_row[j - 1] + (c1 != s2[j - 1]),
+            )
+        if min(current_row[lo - 1 : hi + 1]) > max_distance:
+            return None
+        previous_row = current_row
+
+    distance = previous_row[-1]
+    return distance if distance <= max_distance else None
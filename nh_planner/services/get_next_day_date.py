@@ -34,3 +34,12 @@ def get_next_day_date(day: str) -> Optional[str]:
 
     next_day = today + timedelta(days=days_ahead)
     return next_day.strftime("%Y-%m-%d")
+
+
+def get_next_day_window(day: str) -> Optional[tuple[str, str]]:
+    """Start and end date covering the next occurrence of a day name"""
+    start_date = get_next_day_date(day)
+    if not start_date:
+        return None
+    end_date = datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=1)
+    return start_date, end_date.strftime("%Y-%m-%d")
@@ -0,0 +1,140 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from nh_planner.core.config import (
+    PAGE_CACHE_MAX_BYTES,
+    PAGE_CACHE_PATH,
+    PAGE_CACHE_TTL,
+)
+
+PAGE_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS pages (
+        url TEXT PRIMARY KEY,
+        content BLOB,
+        content_hash TEXT,
+        size INTEGER,
+        fetched_at REAL,
+        accessed_at REAL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at);
+    """
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode()).hexdigest()
+
+
+class CachedPage(NamedTuple):
+    content: str
+    content_hash: str
+    fresh: bool
+
+
+class PageCache:
+    """Fetched HTML on disk, keyed by URL, with a TTL and an LRU size cap"""
+
+    def __init__(
+        self,
+        path: Path = PAGE_CACHE_PATH,
+        ttl: float = PAGE_CACHE_TTL,
+        max_bytes: int = PAGE_CACHE_MAX_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(PAGE_CACHE_SCHEMA)
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT content, content_hash, fetched_at FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self._conn.execute(
+                "UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url)
+            )
+        content, digest, fetched_at = row
+        return CachedPage(
+            zlib.decompress(content).decode(), digest, now - fetched_at < self.ttl
+        )
+
+    def put(self, url: str, html: str) -> str:
+        """Store html for url, evicting least recently used pages over the cap"""
+        digest = content_hash(html)
+        content = zlib.compress(html.encode())
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO pages (url, content, content_hash, size, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    content=excluded.content,
+                    content_hash=excluded.content_hash,
+                    size=excluded.size,
+                    fetched_at=excluded.fetched_at,
+                    accessed_at=excluded.accessed_at
+                """,
+                (url, content, digest, len(content), now, now),
+            )
+            self._evict()
+        return digest
+
+    def touch(self, url: str) -> None:
+        """Mark the cached copy of url as freshly fetched"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, url),
+            )
+
+    def discard(self, url: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+
+    def _evict(self) -> None:
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM pages"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute(
+            "SELECT url, size FROM pages ORDER BY accessed_at"
+        ).fetchall():
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages")
+        self._conn.execute("VACUUM")
+
+    def stats(self) -> dict:
+        with self._lock:
+            pages, size, fresh = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(CASE WHEN fetched_at > ? THEN 1 END) FROM pages",
+                (time.time() - self.ttl,),
+            ).fetchone()
+        return {
+            "pages": pages,
+            "fresh_pages": fresh,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
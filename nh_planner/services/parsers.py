@@ -0,0 +1,190 @@
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PROGRAMME_CLASS = "boks ilustracja-left mala-ilustr wyzszy"
+# (field, marker) pairs looked up in <h4> headings and div.crrow rows.
+H4_MARKERS = (("director", "reż."), ("genre", "gatunek:"))
+CRROW_MARKERS = (("duration", "czas:"), ("production", "produkcja:"))
+
+
+def match_markers(fields: dict, text: str, markers: tuple) -> None:
+    """Fill the first value found for each still missing marker field"""
+    for field, marker in markers:
+        if field not in fields and marker in text:
+            fields[field] = text.replace(marker, "").strip()
+
+
+def module_available(module: str) -> bool:
+    """Whether module can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        # find_spec imports the parents of a dotted name, which may be missing.
+        return False
+
+
+def join_paragraphs(paragraphs: list[str]) -> Optional[str]:
+    return " ".join(p.strip() for p in paragraphs) if paragraphs else None
+
+
+class HtmlParser(ABC):
+    """Extracts raw fields from programme and movie detail pages.
+
+    programme() returns one (title, href, screening times) tuple per film box,
+    with title None when the box has no title link. details() returns the
+    director, genre, duration, production and description texts it found.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def programme(self, html: str) -> list[tuple[Optional[str], str, list[str]]]:
+        pass
+
+    @abstractmethod
+    def details(self, html: str) -> dict[str, Optional[str]]:
+        pass
+
+
+class SoupParser(HtmlParser):
+    """BeautifulSoup on lxml when installed, else the stdlib html.parser"""
+
+    name = "soup"
+
+    def __init__(self):
+        self.features = "lxml" if module_available("lxml") else "html.parser"
+        self._programme_strainer = SoupStrainer("div", PROGRAMME_CLASS)
+
+    def programme(self, html: str) -> list[tuple[Optional[str], str, list[str]]]:
+        soup = BeautifulSoup(html, self.features, parse_only=self._programme_strainer)
+        movies = []
+        for movie_div in soup.find_all("div", PROGRAMME_CLASS):
+            link = movie_div.find("a", class_="tyt")
+            movies.append(
+                (
+                    link.text.strip() if link else None,
+                    link.get("href", "") if link else "",
+                    [a.text.strip() for a in movie_div.find_all("a", class_="xseans")],
+                )
+            )
+        return movies
+
+    def details(self, html: str) -> dict[str, Optional[str]]:
+        soup = BeautifulSoup(html, self.features)
+        fields = {}
+        for element in soup.find_all(["h4", "div"]):
+            if element.name == "h4":
+                match_markers(fields, element.text, H4_MARKERS)
+                continue
+            classes = element.get("class") or []
+            if "crrow" in classes:
+                match_markers(fields, element.text, CRROW_MARKERS)
+            elif "opisf" in classes and "description" not in fields:
+                fields["description"] = join_paragraphs(
+                    [p.text for p in element.find_all("p")]
+                )
+        return fields
+
+
+class LxmlParser(HtmlParser):
+    name = "lxml"
+
+    def programme(self, html: str) -> list[tuple[Optional[str], str, list[str]]]:
+        from lxml import html as lxml_html
+
+        tree = lxml_html.fromstring(html)
+        movies = []
+        for movie_div in tree.xpath(f"//div[@class='{PROGRAMME_CLASS}']"):
+            links = movie_div.xpath(".//a[contains(concat(' ', @class, ' '), ' tyt ')]")
+            movies.append(
+                (
+                    links[0].text_content().strip() if links else None,
+                    links[0].get("href", "") if links else "",
+                    [
+                        a.text_content().strip()
+                        for a in movie_div.xpath(
+                            ".//a[contains(concat(' ', @class, ' '), ' xseans ')]"
+                        )
+                    ],
+                )
+            )
+        return movies
+
+    def details(self, html: str) -> dict[str, Optional[str]]:
+        from lxml import html as lxml_html
+
+        tree = lxml_html.fromstring(html)
+        fields = {}
+        for element in tree.xpath("//h4 | //div[@class]"):
+            if element.tag == "h4":
+                match_markers(fields, element.text_content(), H4_MARKERS)
+                continue
+            classes = element.get("class").split()
+            if "crrow" in classes:
+                match_markers(fields, element.text_content(), CRROW_MARKERS)
+            elif "opisf" in classes and "description" not in fields:
+                fields["description"] = join_paragraphs(
+                    [p.text_content() for p in element.iter("p")]
+                )
+        return fields
+
+
+class SelectolaxParser(HtmlParser):
+    name = "selectolax"
+
+    def programme(self, html: str) -> list[tuple[Optional[str], str, list[str]]]:
+        from selectolax.lexbor import LexborHTMLParser
+
+        movies = []
+        for movie_div in LexborHTMLParser(html).css(f'div[class="{PROGRAMME_CLASS}"]'):
+            link = movie_div.css_first("a.tyt")
+            movies.append(
+                (
+                    link.text().strip() if link else None,
+                    (link.attributes.get("href") or "") if link else "",
+                    [a.text().strip() for a in movie_div.css("a.xseans")],
+                )
+            )
+        return movies
+
+    def details(self, html: str) -> dict[str, Optional[str]]:
+        from selectolax.lexbor import LexborHTMLParser
+
+        fields = {}
+        for element in LexborHTMLParser(html).css("h4, div.crrow, div.opisf"):
+            if element.tag == "h4":
+                match_markers(fields, element.text(), H4_MARKERS)
+            elif "crrow" in (element.attributes.get("class") or "").split():
+                match_markers(fields, element.text(), CRROW_MARKERS)
+            elif "description" not in fields:
+                fields["description"] = join_paragraphs(
+                    [p.text() for p in element.css("p")]
+                )
+        return fields
+
+
+# Fastest first; each needs its backend module to be importable.
+PARSERS = {
+    "selectolax": ("selectolax.lexbor", SelectolaxParser),
+    "lxml": ("lxml", LxmlParser),
+    "soup": ("bs4", SoupParser),
+}
+
+
+def available_parsers() -> list[str]:
+    return [name for name, (module, _) in PARSERS.items() if module_available(module)]
+
+
+def get_parser(name: Optional[str] = None) -> HtmlParser:
+    """Parser by name, or the fastest one whose backend is installed"""
+    available = available_parsers()
+    if name is None:
+        name = available[0]
+    elif name not in available:
+        raise ValueError(
+            f"HTML parser {name} is not available ({', '.join(available)})"
+        )
+    return PARSERS[name][1]()
@@ -0,0 +1,147 @@
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urldefrag
+
+from playwright.async_api import Route
+
+from nh_planner.core.config import BASE_URL
+from nh_planner.services.scraper import Fetcher
+
+# Replay-only address of a recorded programme day; DD-MM-YYYY follows.
+REPLAY_PROGRAMME_URL = f"{BASE_URL}__replay__/"
+REPLAY_SHELL = """<html><body><script>
+async function render() {
+  document.body.innerHTML = "";
+  const day = location.hash.split("@")[1];
+  const response = await fetch("/__replay__/" + day);
+  document.documentElement.innerHTML = await response.text();
+}
+window.addEventListener("hashchange", render);
+render();
+</script></body></html>"""
+
+# Navigation, scripts and footer of roughly the size found on kinonh.pl.
+PAGE_CHROME = (
+    "<script>"
+    + "var x=1;" * 2_000
+    + "</script>"
+    + "<nav>"
+    + "".join(f'<a href="p{i}.html">Link {i}</a>' for i in range(300))
+    + "</nav>"
+)
+
+
+def synthetic_programme_html(films: int) -> str:
+    boxes = "".join(
+        f'<div class="boks ilustracja-left mala-ilustr wyzszy">'
+        f'<img src="img/{i}.jpg"><a class="tyt" href="film.s?id={i}">Film {i}</a>'
+        f'<a class="xseans">{10 + i % 12}:00</a><a class="xseans">{12 + i % 10}:30</a>'
+        f"</div>"
+        for i in range(films)
+    )
+    return f"<html><head>{PAGE_CHROME}</head><body>{boxes}</body></html>"
+
+
+def synthetic_detail_html(i: int) -> str:
+    return (
+        f"<html><head>{PAGE_CHROME}</head><body><div class='film'>"
+        f"<h4>reż. Reżyser {i % 500}</h4>"
+        f"<h4>gatunek: dramat kategoria wiekowa: 15</h4>"
+        f'<div class="crrow">czas: {80 + i % 90} min.</div>'
+        f'<div class="crrow">produkcja: Polska 2024</div>'
+        f'<div class="opisf">' + f"<p>Opis filmu {i}. </p>" * 8 + "</div>"
+        "</div></body></html>"
+    )
+
+
+def programme_fixture(date: str) -> str:
+    return f"programme-{date}.html"
+
+
+def details_fixture(href: str) -> str:
+    """File name of a detail page, from its href relative to the site root"""
+    if href.startswith(BASE_URL):
+        href = href[len(BASE_URL) :]
+    return f"details-{re.sub(r'[^A-Za-z0-9.-]+', '_', href.lstrip('/'))}.html"
+
+
+def write_synthetic_fixtures(directory: Path, dates: list[str], films: int) -> None:
+    """Fixtures for `films` films playing on each of `dates`"""
+    programme = synthetic_programme_html(films)
+    for date in dates:
+        (directory / programme_fixture(date)).write_text(programme)
+    for i in range(films):
+        (directory / details_fixture(f"film.s?id={i}")).write_text(
+            synthetic_detail_html(i)
+        )
+
+
+class RecordingFetcher(Fetcher):
+    """Wraps a fetcher and saves every page it returns as a fixture"""
+
+    def __init__(self, fetcher: Fetcher, directory: Path):
+        self.fetcher = fetcher
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    async def open(self, jobs: int) -> None:
+        await self.fetcher.open(jobs)
+
+    async def close(self) -> None:
+        await self.fetcher.close()
+
+    async def programme(self, date: str) -> str:
+        html = await self.fetcher.programme(date)
+        (self.directory / programme_fixture(date)).write_text(html)
+        return html
+
+    async def details(self, href: str) -> str:
+        html = await self.fetcher.details(href)
+        (self.directory / details_fixture(href)).write_text(html)
+        return html
+
+
+class ReplayRoute:
+    """Playwright route handler that answers kinonh.pl requests from fixtures.
+
+    The programme day lives in the #repertuar@ fragment, which never reaches
+    the network, so the site root is answered with a shell page that loads the
+    day in location.hash on every hash change, as the site's own script does.
+    Programme requests for a date without a recording fall back to one of the
+    recorded days, so old recordings keep replaying as the calendar moves on.
+    Anything without a fixture gets a 404.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.programmes = sorted(directory.glob("programme-*.html"))
+        self.pages = 0
+
+    def fixture(self, url: str) -> Optional[Path]:
+        if url.startswith(REPLAY_PROGRAMME_URL):
+            date = datetime.strptime(url[len(REPLAY_PROGRAMME_URL) :], "%d-%m-%Y")
+            fixture = self.directory / programme_fixture(date.strftime("%Y-%m-%d"))
+            if fixture.exists() or not self.programmes:
+                return fixture
+            return self.programmes[date.toordinal() % len(self.programmes)]
+        if url.startswith(BASE_URL):
+            return self.directory / details_fixture(url)
+        return None
+
+    async def __call__(self, route: Route) -> None:
+        url = route.request.url
+        if urldefrag(url).url == BASE_URL:
+            await route.fulfill(body=REPLAY_SHELL, content_type="text/html")
+            return
+        try:
+            fixture = self.fixture(url)
+            body = fixture.read_bytes() if fixture else None
+        except (OSError, ValueError):
+            body = None
+        if body is None:
+            await route.fulfill(status=404, body="")
+            return
+        self.pages += 1
+        await route.fulfill(body=body, content_type="text/html; charset=utf-8")
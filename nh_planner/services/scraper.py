@@ -1,205 +1,406 @@
 import asyncio
 import logging
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
 
-from bs4 import BeautifulSoup
-from playwright.async_api import Page, async_playwright
+from playwright.async_api import Browser, Page, Route, async_playwright
 from tqdm.asyncio import tqdm_asyncio
 
-from nh_planner.core.config import BASE_URL, PROGRAMME_URL
-from nh_planner.core.models import Movie, Screening
+from nh_planner.core.config import (
+    BASE_URL,
+    BLOCKED_RESOURCE_TYPES,
+    BLOCKED_URL_PATTERNS,
+    PAGE_WAIT_UNTIL,
+    PROGRAMME_URL,
+)
+from nh_planner.core.models import DayChanges, Movie, ProgrammeEntry
 from nh_planner.services.database import Database
+from nh_planner.services.page_cache import CachedPage, PageCache, content_hash
+from nh_planner.services.parsers import HtmlParser, get_parser
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
 logging.getLogger("asyncio").setLevel(logging.ERROR)
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def programme_url(date: str) -> str:
+    DD_MM_YYYY = "-".join(date.split("-")[::-1])
+    return f"{PROGRAMME_URL}{DD_MM_YYYY}"
+
+
+class ProgrammePage(NamedTuple):
+    """A programme day; movies is None when the page is unchanged since it
+    was last ingested, fetched is False when html came from a fresh cache hit"""
+
+    url: str
+    html: str
+    movies: Optional[list[dict]]
+    fetched: bool = True
+
 
 class Scraper:
-    def __init__(self, db: Database):
+    def __init__(
+        self,
+        db: Database,
+        fetcher: Optional["Fetcher"] = None,
+        parser: Optional[HtmlParser] = None,
+        page_cache: Optional[PageCache] = None,
+    ):
         self.db = db
+        self.fetcher = fetcher or PlaywrightFetcher()
+        self.parser = parser or get_parser()
+        self.page_cache = page_cache
 
     async def get_movies_from_page(self, html: str) -> list[dict]:
-        soup = BeautifulSoup(html, "html.parser")
-
         movies = []
-        for movie_div in soup.find_all(
-            "div", "boks ilustracja-left mala-ilustr wyzszy"
-        ):
-            try:
-                link = movie_div.find("a", class_="tyt")
-                if not link:
-                    logger.warning("Found movie div without title link")
-                    continue
-
-                screenings = movie_div.find_all("a", class_="xseans")
-                if not screenings:
-                    logger.warning(f"No screenings found for movie {link.text.strip()}")
-                    continue
-
-                movies.append(
-                    {
-                        "title": link.text.strip(),
-                        "href": BASE_URL + link.get("href", ""),
-                        "screenings": [a.text for a in screenings],
-                    }
-                )
-            except Exception as e:
-                logger.error(f"Error processing movie div: {e}")
-                movies.append(
-                    {
-                        "title": link.text.strip(),
-                        "href": BASE_URL + link.get("href", ""),
-                        "screenings": [
-                            a.text for a in movie_div.find_all("a", class_="xseans")
-                        ],
-                    }
-                )
+        for title, href, screenings in self.parser.programme(html):
+            if not title:
+                logger.warning("Found movie div without title link")
+                continue
+            if not screenings:
+                logger.warning(f"No screenings found for movie {title}")
+                continue
+            movies.append(
+                {"title": title, "href": BASE_URL + href, "screenings": screenings}
+            )
         return movies
 
     async def extract_movie_details(
         self, html: str, title: str, href: str
     ) -> Optional[Movie]:
         try:
-            soup = BeautifulSoup(html, "html.parser")
+            fields = self.parser.details(html)
 
-            duration = next(
-                (
-                    div.text.replace("czas:", "").strip()
-                    for div in soup.find_all("div", class_="crrow")
-                    if "czas:" in div.text
-                ),
-                None,
-            )
+            duration = fields.get("duration")
             duration = (
                 int("".join(c for c in duration if c.isdigit())) if duration else 0
             )
-
-            director = next(
-                (
-                    h4.text.replace("reż.", "").strip()
-                    for h4 in soup.find_all("h4")
-                    if "reż." in h4.text
-                ),
-                None,
-            )
-
-            genre = next(
-                (
-                    h4.text.replace("gatunek:", "").strip()
-                    for h4 in soup.find_all("h4")
-                    if "gatunek:" in h4.text
-                ),
-                None,
-            )
+            genre = fields.get("genre")
             genre = genre.split("kategoria wiekowa")[0].strip() if genre else None
 
-            production = next(
-                (
-                    div.text.replace("produkcja:", "").strip()
-                    for div in soup.find_all("div", class_="crrow")
-                    if "produkcja:" in div.text
-                ),
-                None,
-            )
-
-            opisf = soup.find("div", class_="opisf")
-            description = (
-                " ".join(i.text.strip() for i in opisf.find_all("p"))
-                if opisf and opisf.find_all("p")
-                else None
-            )
-
             return Movie(
                 title=title,
                 duration=duration,
-                director=director,
+                director=fields.get("director"),
                 genre=genre,
-                production=production,
-                description=description,
+                production=fields.get("production"),
+                description=fields.get("description"),
                 href=href,
             )
         except Exception as e:
             logger.error(f"Error extracting movie details from {href}: {e}")
             return None
 
-    async def process_movie(self, page: Page, movie: dict, date: str):
-        title = movie["title"]
-        screenings = [date + " " + s for s in movie["screenings"]]
+    async def fetch_programme(
+        self, date: str, force_scrape: bool = False
+    ) -> ProgrammePage:
+        url = programme_url(date)
+        cached = await self._cached_page(url)
+        if cached and cached.fresh and not force_scrape:
+            movies = await self.get_movies_from_page(cached.content)
+            return ProgrammePage(url, cached.content, movies, fetched=False)
+
+        html = await self.fetcher.programme(date)
+        if (
+            cached
+            and cached.content_hash == content_hash(html)
+            and await asyncio.to_thread(self.db.is_date_scraped, date)
+        ):
+            await asyncio.to_thread(self.page_cache.touch, url)
+            return ProgrammePage(url, html, None)
+        return ProgrammePage(url, html, await self.get_movies_from_page(html))
 
-        result = await asyncio.to_thread(self.db.get_movie, title)
-        if result:
-            movie_id = result
+    async def fetch_movie_details(self, movie: dict) -> Optional[Movie]:
+        href = movie["href"]
+        cached = await self._cached_page(href)
+        if cached and cached.fresh:
+            html = cached.content
         else:
+            html = await self.fetcher.details(href)
+            if self.page_cache:
+                await asyncio.to_thread(self.page_cache.put, href, html)
+        return await self.extract_movie_details(html, movie["title"], href)
+
+    async def _cached_page(self, url: str) -> Optional[CachedPage]:
+        if not self.page_cache:
+            return None
+        return await asyncio.to_thread(self.page_cache.get, url)
+
+    async def timed(self, fetch: Awaitable[T], label: str) -> Optional[T]:
+        """Await a fetch, logging its duration; failures are logged and give None"""
+        start = time.perf_counter()
+        try:
+            result = await fetch
+        except Exception as e:
+            logger.error(f"Failed to fetch {label}: {e}")
+            return None
+        logger.info(f"Fetched {label} in {time.perf_counter() - start:.2f}s")
+        return result
+
+    def build_entries(
+        self,
+        date: str,
+        movies: list[dict],
+        known: dict[str, int],
+        details: dict[str, Movie],
+    ) -> list[ProgrammeEntry]:
+        entries = []
+        for movie in movies:
+            href = movie["href"]
+            if href not in known and href not in details:
+                continue
             try:
-                await page.goto(movie["href"])
-                await page.wait_for_selector(".opisf", timeout=5_000)
-                html = await page.content()
-                movie_details = await self.extract_movie_details(
-                    html, title, movie["href"]
+                entries.append(
+                    ProgrammeEntry(
+                        movie_id=known.get(href),
+                        movie=details.get(href),
+                        screenings=[date + " " + s for s in movie["screenings"]],
+                    )
                 )
-
-                if movie_details:
-                    movie_id = await asyncio.to_thread(self.db.add_movie, movie_details)
             except Exception as e:
-                logger.error(f"Error processing movie details for {title}: {e}")
-                return
+                logger.error(f"Error adding screenings for {movie['title']}: {e}")
+        return entries
 
-        if movie_id and screenings:
+    async def scrape_movies(
+        self, days_ahead: int = 7, force_scrape: bool = False, jobs: int = 1
+    ) -> list[DayChanges]:
+        scrape_dates = [
+            (datetime.now() + timedelta(days=i)).strftime("%Y-%m-%d")
+            for i in range(1, days_ahead + 1)
+        ]
+        if not force_scrape:
+            scraped = [
+                date
+                for date in scrape_dates
+                if await asyncio.to_thread(self.db.is_date_scraped, date)
+            ]
+            for date in scraped:
+                logger.info(f"Date {date} already scraped, skipping...")
+            scrape_dates = [date for date in scrape_dates if date not in scraped]
+        if not scrape_dates:
+            return []
+
+        await self.fetcher.open(jobs)
+        try:
+            programmes = await tqdm_asyncio.gather(
+                *(
+                    self.timed(self.fetch_programme(date, force_scrape), f"date {date}")
+                    for date in scrape_dates
+                ),
+                desc="Programme",
+            )
+
+            # Each film is fetched once per run, however many days it plays.
+            known = await asyncio.to_thread(self.db.get_movie_ids_by_href)
+            missing = {
+                movie["href"]: movie
+                for programme in programmes
+                if programme and programme.movies
+                for movie in programme.movies
+                if movie["screenings"] and movie["href"] not in known
+            }
+            fetched = await tqdm_asyncio.gather(
+                *(
+                    self.timed(
+                        self.fetch_movie_details(movie),
+                        f"movie details for {movie['title']}",
+                    )
+                    for movie in missing.values()
+                ),
+                desc="Details",
+            )
+        finally:
+            await self.fetcher.close()
+
+        details = {
+            href: movie
+            for href, movie in zip(missing, fetched, strict=True)
+            if movie is not None
+        }
+        changes = []
+        for date, programme in zip(scrape_dates, programmes, strict=True):
+            if programme is None:
+                continue
+            if programme.movies is None:
+                logger.info(f"Programme for {date} unchanged, skipping...")
+                changes.append(DayChanges(date))
+                continue
             try:
-                screening_objects = [
-                    Screening(movie_id=movie_id, date=s) for s in screenings
-                ]
-                await asyncio.to_thread(self.db.add_screenings, screening_objects)
+                entries = self.build_entries(date, programme.movies, known, details)
+                day = await asyncio.to_thread(
+                    self.db.ingest_day, date, entries, force_scrape
+                )
             except Exception as e:
-                logger.error(f"Error adding screenings for {title}: {e}")
+                logger.error(f"Failed to process date {date}: {e}")
+                continue
+            logger.info(
+                f"Date {date}: {day.added} screenings added, {day.removed} removed"
+            )
+            changes.append(day)
+            if not self.page_cache:
+                continue
+            # The cached hash lets later runs skip an unchanged day, so it is
+            # only kept when every film of the day made it into the database.
+            if len(entries) < len(programme.movies):
+                logger.warning(
+                    f"Date {date}: {len(programme.movies) - len(entries)} films "
+                    "missing, it will be re-parsed on the next forced refresh"
+                )
+                await asyncio.to_thread(self.page_cache.discard, programme.url)
+            elif programme.fetched:
+                # Re-storing a cache hit would restart its TTL without a download.
+                await asyncio.to_thread(
+                    self.page_cache.put, programme.url, programme.html
+                )
+        return changes
 
-    async def process_date(self, page: Page, date: str, force_scrape: bool = False):
-        if force_scrape:
-            await asyncio.to_thread(self.db.clear_date_screenings, date)
-            await asyncio.to_thread(self.db.clear_scraped_date, date)
-        if await asyncio.to_thread(self.db.is_date_scraped, date):
-            logger.info(f"Date {date} already scraped, skipping...")
-            return
 
-        DD_MM_YYYY = "-".join(date.split("-")[::-1])
-        await page.goto(f"{PROGRAMME_URL}{DD_MM_YYYY}")
+class Fetcher(ABC):
+    """Source of programme and movie detail HTML"""
 
-        await page.wait_for_selector(".tyt", timeout=5_000)
+    # Optional hooks, so they are deliberately concrete no-ops.
+    async def open(self, jobs: int) -> None:  # noqa: B027
+        """Prepare for up to jobs concurrent fetches"""
 
-        html = await page.content()
-        movies = await self.get_movies_from_page(html)
+    async def close(self) -> None:  # noqa: B027
+        """Release what open() acquired"""
 
-        for movie in movies:
-            await self.process_movie(page, movie, date)
+    @abstractmethod
+    async def programme(self, date: str) -> str:
+        pass
 
-        await asyncio.to_thread(self.db.mark_date_scraped, date)
+    @abstractmethod
+    async def details(self, href: str) -> str:
+        pass
 
-    async def scrape_movies(
-        self, days_ahead: int = 7, force_scrape: bool = False
-    ) -> None:
-        scrape_dates = [
-            (datetime.now() + timedelta(days=i)).strftime("%Y-%m-%d")
-            for i in range(1, days_ahead + 1)
-        ]
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
+class PlaywrightFetcher(Fetcher):
+    """Renders pages in headless Chromium.
 
-            try:
-                for date in tqdm_asyncio(scrape_dates):
-                    try:
-                        await self.process_date(page, date, force_scrape)
-                    except Exception as e:
-                        logger.error(f"Failed to process date {date}: {e}")
-                        try:
-                            await page.close()
-                        except Exception as e:
-                            pass
-                        page = await browser.new_page()
-                        continue
-            finally:
-                await browser.close()
+    Requests for blocked resource types or URLs matching a blocked pattern are
+    aborted, and navigation only waits for wait_until before polling for the
+    content selector. The remaining requests go to the network, or to replay
+    when given (e.g. a ReplayRoute answering from recorded fixtures).
+    """
+
+    def __init__(
+        self,
+        blocked_types: Iterable[str] = BLOCKED_RESOURCE_TYPES,
+        blocked_urls: Iterable[str] = BLOCKED_URL_PATTERNS,
+        wait_until: str = PAGE_WAIT_UNTIL,
+        replay: Optional[Callable[[Route], Awaitable[None]]] = None,
+    ):
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_urls = tuple(blocked_urls)
+        self.wait_until = wait_until
+        self.replay = replay
+        self.blocked = 0
+
+    async def open(self, jobs: int) -> None:
+        self.blocked = 0
+        self._playwright = await async_playwright().start()
+        try:
+            self._browser = await self._playwright.chromium.launch()
+            routed = self.blocked_types or self.blocked_urls or self.replay
+            route = self._route if routed else None
+            self._pool = PagePool(self._browser, jobs, route)
+            await self._pool.open()
+        except Exception:
+            await self._playwright.stop()
+            raise
+
+    async def close(self) -> None:
+        try:
+            await self._browser.close()
+        finally:
+            await self._playwright.stop()
+        logger.info(f"Blocked {self.blocked} resource requests")
+
+    async def _route(self, route: Route) -> None:
+        request = route.request
+        if request.resource_type in self.blocked_types or any(
+            pattern in request.url for pattern in self.blocked_urls
+        ):
+            self.blocked += 1
+            await route.abort()
+        elif self.replay:
+            await self.replay(route)
+        else:
+            await route.continue_()
+
+    async def _render(self, url: str, selector: str) -> str:
+        async with self._pool.page() as page:
+            start = time.perf_counter()
+            await page.goto(url, wait_until=self.wait_until)
+            await page.wait_for_selector(selector, timeout=5_000)
+            logger.info(f"Loaded {url} in {time.perf_counter() - start:.2f}s")
+            return await page.content()
+
+    async def programme(self, date: str) -> str:
+        return await self._render(programme_url(date), ".tyt")
+
+    async def details(self, href: str) -> str:
+        return await self._render(href, ".opisf")
+
+
+class PagePool:
+    """Bounded pool of Playwright pages, each in its own browser context"""
+
+    def __init__(
+        self,
+        browser: Browser,
+        size: int,
+        route: Optional[Callable[[Route], Awaitable[None]]] = None,
+    ):
+        self.browser = browser
+        self.size = max(1, size)
+        self.route = route
+        # None marks a slot whose page died and could not be replaced yet.
+        self._pages: asyncio.Queue[Optional[Page]] = asyncio.Queue()
+
+    async def open(self) -> None:
+        for _ in range(self.size):
+            self._pages.put_nowait(await self._new_page())
+
+    async def _new_page(self) -> Page:
+        page = await self.browser.new_page()
+        if self.route:
+            await page.context.route("**/*", self.route)
+        return page
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """Borrow a page; one that fails is closed and replaced"""
+        page = await self._pages.get()
+        try:
+            if page is None:
+                page = await self._new_page()
+            yield page
+        except Exception:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                try:
+                    page = await self._new_page()
+                except Exception as e:
+                    logger.error(f"Failed to replace a browser page: {e}")
+                    page = None
+            raise
+        finally:
+            self._pages.put_nowait(page)
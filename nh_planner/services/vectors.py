@@ -0,0 +1,24 @@
+from typing import Sequence, Union
+
+import numpy as np
+
+
+def as_matrix(vectors: Union[Sequence[Sequence[float]], np.ndarray]) -> np.ndarray:
+    """Contiguous 2-D float32 matrix with one vector per row"""
+    return np.ascontiguousarray(np.atleast_2d(vectors), dtype=np.float32)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place; zero rows are left as they are"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def to_blob(vector: np.ndarray) -> np.ndarray:
+    """sqlite-vec float32 blob; sqlite3 binds the array's buffer directly"""
+    return np.ascontiguousarray(vector, dtype=np.float32)
+
+
+def from_blob(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)